@@ -0,0 +1,96 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.coverage_index import coverage_index
+from app.database import AsyncSessionLocal, get_async_engine
+from app.decision_cache import cached_coverage_decision, sync_coverage_index
+from app.kpi_alerts import contract_alerts_statement
+from app.kpi_engine import GRANULARITIES, assemble_kpi_series, kpi_series_statement
+from app.response_cache import cached_response, response_cache
+from app.serialization import dumps
+from app.services import KPI_TYPES
+
+router = APIRouter()
+
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def contract_exists(db: AsyncSession, contract_id: int) -> bool:
+    result = await db.execute(select(models.Contract.id).where(models.Contract.id == contract_id))
+    return result.first() is not None
+
+
+@router.post("/decisions/coverage", response_model=schemas.DecisionResponse)
+async def coverage_decision(payload: schemas.DecisionRequest):
+    if coverage_index.refresh_due():
+        await run_in_threadpool(sync_coverage_index, coverage_index)
+    if coverage_index.needs_lookup(payload.contract_id, payload.appendix_id):
+        await run_in_threadpool(coverage_index.load_missing, payload.contract_id, payload.appendix_id)
+    return cached_coverage_decision(
+        coverage_index,
+        contract_id=payload.contract_id,
+        appendix_id=payload.appendix_id,
+        product_id=payload.product_id,
+        event_date=payload.event_date,
+        inputs=payload.inputs.model_dump(),
+    )
+
+
+@router.get("/kpi/contracts/{contract_id}/series", response_model=List[schemas.KPISeries])
+async def kpi_series(
+    request: Request,
+    contract_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    granularity: str = "day",
+    kpi_types: Optional[List[str]] = Query(None, alias="kpi_type"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="invalid granularity")
+    if kpi_types is not None and not set(kpi_types) <= KPI_TYPES:
+        raise HTTPException(status_code=400, detail="invalid kpi_type")
+
+    key = response_cache.key("series", contract_id, date_from, date_to, granularity, kpi_types)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_response(request, cached)
+    generation = response_cache.generation(contract_id)
+
+    if not await contract_exists(db, contract_id):
+        raise HTTPException(status_code=404, detail="contract not found")
+
+    rows = await db.execute(kpi_series_statement(contract_id, date_from, date_to, kpi_types))
+    body = dumps(
+        [
+            {"kpi_type": kpi_type, "series": series}
+            for kpi_type, series in assemble_kpi_series(rows, granularity, kpi_types)
+        ]
+    )
+    return cached_response(request, response_cache.put(contract_id, key, body, generation))
+
+
+@router.get("/kpi/contracts/{contract_id}/alerts", response_model=List[schemas.KPIAlert])
+async def kpi_alerts(request: Request, contract_id: int, db: AsyncSession = Depends(get_async_db)):
+    key = response_cache.key("alerts", contract_id)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_response(request, cached)
+    generation = response_cache.generation(contract_id)
+
+    if not await contract_exists(db, contract_id):
+        raise HTTPException(status_code=404, detail="contract not found")
+
+    rows = await db.execute(contract_alerts_statement(contract_id))
+    body = dumps([row._asdict() for row in rows])
+    return cached_response(request, response_cache.put(contract_id, key, body, generation))
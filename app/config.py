@@ -0,0 +1,43 @@
+from typing import Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="APP_", env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./app.db"
+    async_database_url: Optional[str] = None
+    async_endpoints: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    create_schema: bool = False
+    seed_demo_data: bool = False
+    instrumentation: bool = False
+
+    response_cache: bool = True
+    response_cache_ttl_seconds: float = 30.0
+    response_cache_max_entries: int = 1024
+    response_cache_backend: Optional[str] = None
+
+    decision_cache_max_entries: int = 10000
+    coverage_refresh_seconds: float = 1.0
+
+    kpi_retention_months: int = 24
+
+    sqlite_tuning: bool = True
+    sqlite_journal_mode: Literal["delete", "truncate", "persist", "memory", "wal", "off"] = "wal"
+    sqlite_synchronous: Literal["off", "normal", "full", "extra"] = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size_bytes: int = 268435456
+
+    def resolved_async_database_url(self) -> str:
+        if self.async_database_url:
+            return self.async_database_url
+        if self.database_url.startswith("sqlite://"):
+            return self.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        return self.database_url
+
+
+settings = Settings()
@@ -0,0 +1,163 @@
+import argparse
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.coverage_index import AppendixRecord, ContractRecord, LineRecord, record_coverage_changes
+from app.database import SessionLocal, chunked, get_engine
+from app.migrations import upgrade
+
+IMPORT_CHUNK_ROWS = 5000
+
+ImportedRecords = Tuple[List[ContractRecord], List[AppendixRecord], List[LineRecord]]
+
+
+def existing_ids(db: Session, column, ids: Iterable[int]) -> Set[int]:
+    found: Set[int] = set()
+    for chunk in chunked(set(ids)):
+        found.update(db.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def contract_import_error(db: Session, contracts: List[schemas.ContractImport]) -> Optional[str]:
+    for contract_index, contract in enumerate(contracts):
+        for appendix_index, appendix in enumerate(contract.appendices):
+            path = f"contracts[{contract_index}].appendices[{appendix_index}]"
+            if not (contract.start_date <= appendix.start_date and appendix.end_date <= contract.end_date):
+                return f"date hierarchy invalid at {path}"
+            products: Set[int] = set()
+            for line_index, line in enumerate(appendix.lines):
+                if not (appendix.start_date <= line.start_date and line.end_date <= appendix.end_date):
+                    return f"date hierarchy invalid at {path}.lines[{line_index}]"
+                if line.product_id in products:
+                    return f"duplicate product_id at {path}.lines[{line_index}]"
+                products.add(line.product_id)
+
+    client_ids = {contract.client_id for contract in contracts}
+    if client_ids - existing_ids(db, models.Client.id, client_ids):
+        return "client_id not found"
+
+    product_ids = {
+        line.product_id for contract in contracts for appendix in contract.appendices for line in appendix.lines
+    }
+    if product_ids - existing_ids(db, models.Product.id, product_ids):
+        return "product_id not found"
+    return None
+
+
+def insert_returning_ids(db: Session, table, rows: List[Dict[str, object]]) -> List[int]:
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    ids: List[int] = []
+    for start in range(0, len(rows), IMPORT_CHUNK_ROWS):
+        ids.extend(db.execute(statement, rows[start : start + IMPORT_CHUNK_ROWS]).scalars())
+    return ids
+
+
+def import_contract_graphs(
+    db: Session, contracts: List[schemas.ContractImport]
+) -> Tuple[schemas.ContractImportResult, ImportedRecords]:
+    contract_ids = insert_returning_ids(
+        db,
+        models.Contract.__table__,
+        [contract.model_dump(exclude={"appendices"}) for contract in contracts],
+    )
+
+    appendices = [
+        (contract_id, appendix)
+        for contract_id, contract in zip(contract_ids, contracts)
+        for appendix in contract.appendices
+    ]
+    appendix_ids = insert_returning_ids(
+        db,
+        models.Appendix.__table__,
+        [
+            {"contract_id": contract_id, **appendix.model_dump(exclude={"lines"})}
+            for contract_id, appendix in appendices
+        ],
+    )
+
+    lines = [
+        (appendix_id, line) for appendix_id, (_, appendix) in zip(appendix_ids, appendices) for line in appendix.lines
+    ]
+    line_ids = insert_returning_ids(
+        db,
+        models.ContractLine.__table__,
+        [{"appendix_id": appendix_id, **line.model_dump()} for appendix_id, line in lines],
+    )
+    record_coverage_changes(db, contract_ids)
+
+    records = (
+        [
+            ContractRecord(contract_id, contract.start_date, contract.end_date, contract.status)
+            for contract_id, contract in zip(contract_ids, contracts)
+        ],
+        [
+            AppendixRecord(appendix_id, contract_id, appendix.start_date, appendix.end_date, appendix.status)
+            for appendix_id, (contract_id, appendix) in zip(appendix_ids, appendices)
+        ],
+        [
+            LineRecord(
+                line_id,
+                appendix_id,
+                line.product_id,
+                line.start_date,
+                line.end_date,
+                line.status,
+                line.warranty_start_rule,
+                line.warranty_duration_months,
+                line.warranty_options,
+                line.out_of_warranty_options,
+                line.required_inputs,
+            )
+            for line_id, (appendix_id, line) in zip(line_ids, lines)
+        ],
+    )
+    result = schemas.ContractImportResult(
+        contracts=len(contract_ids),
+        appendices=len(appendix_ids),
+        lines=len(line_ids),
+        contract_ids=contract_ids,
+    )
+    return result, records
+
+
+def read_contract_graphs(data: bytes) -> List[schemas.ContractImport]:
+    if data.lstrip().startswith(b"["):
+        return TypeAdapter(List[schemas.ContractImport]).validate_json(data)
+    return [schemas.ContractImport.model_validate_json(line) for line in data.splitlines() if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import contracts with their appendices and lines from a JSON array or NDJSON file "
+        "in one transaction."
+    )
+    parser.add_argument("path", nargs="?", help="file to read instead of stdin")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, "rb") as handle:
+            data = handle.read()
+    else:
+        data = sys.stdin.buffer.read()
+    contracts = read_contract_graphs(data)
+
+    upgrade(get_engine())
+    db = SessionLocal()
+    try:
+        error = contract_import_error(db, contracts)
+        if error is not None:
+            parser.error(error)
+        result, _ = import_contract_graphs(db, contracts)
+        db.commit()
+    finally:
+        db.close()
+    print(f"imported {result.contracts} contracts, {result.appendices} appendices, {result.lines} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import models
+from app.config import settings
+from app.database import IN_CHUNK_SIZE, SessionLocal, chunked, execute_many
+from app.services import match_line
+
+COVERAGE_CHANGES_KEEP = 10000
+
+
+class ContractRecord(NamedTuple):
+    id: int
+    start_date: date
+    end_date: date
+    status: str
+
+
+class AppendixRecord(NamedTuple):
+    id: int
+    contract_id: int
+    start_date: date
+    end_date: date
+    status: str
+
+
+class LineRecord:
+    __slots__ = (
+        "id",
+        "appendix_id",
+        "product_id",
+        "start_date",
+        "end_date",
+        "status",
+        "warranty_start_rule",
+        "warranty_duration_months",
+        "warranty_options",
+        "out_of_warranty_options",
+        "required_inputs",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        appendix_id: int,
+        product_id: int,
+        start_date: date,
+        end_date: date,
+        status: str,
+        warranty_start_rule: str,
+        warranty_duration_months: int,
+        warranty_options: Iterable[str],
+        out_of_warranty_options: Iterable[str],
+        required_inputs: Iterable[str],
+    ) -> None:
+        set_field = object.__setattr__
+        set_field(self, "id", id)
+        set_field(self, "appendix_id", appendix_id)
+        set_field(self, "product_id", product_id)
+        set_field(self, "start_date", start_date)
+        set_field(self, "end_date", end_date)
+        set_field(self, "status", status)
+        set_field(self, "warranty_start_rule", warranty_start_rule)
+        set_field(self, "warranty_duration_months", warranty_duration_months)
+        set_field(self, "warranty_options", tuple(warranty_options))
+        set_field(self, "out_of_warranty_options", tuple(out_of_warranty_options))
+        set_field(self, "required_inputs", frozenset(required_inputs))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"LineRecord(id={self.id}, appendix_id={self.appendix_id}, product_id={self.product_id})"
+
+
+CONTRACT_COLUMNS = (
+    models.Contract.id,
+    models.Contract.start_date,
+    models.Contract.end_date,
+    models.Contract.status,
+)
+APPENDIX_COLUMNS = (
+    models.Appendix.id,
+    models.Appendix.contract_id,
+    models.Appendix.start_date,
+    models.Appendix.end_date,
+    models.Appendix.status,
+)
+LINE_COLUMNS = tuple(models.ContractLine.__table__.columns)
+
+MISSING_MAX_ENTRIES = 10000
+
+
+class LineIntervals:
+    __slots__ = ("contract", "candidates", "starts", "outcomes")
+
+    def __init__(self, contract: ContractRecord, candidates: Tuple[Tuple[AppendixRecord, LineRecord], ...]) -> None:
+        self.contract = contract
+        self.candidates = candidates
+
+        events: Dict[int, List[Tuple[int, bool, int]]] = {}
+        for order, (app, line) in enumerate(candidates):
+            if app.status != "active" or line.status != "active":
+                continue
+            start = max(app.start_date, line.start_date).toordinal()
+            end = min(app.end_date, line.end_date).toordinal() + 1
+            if start >= end:
+                continue
+            valid = (
+                contract.start_date <= app.start_date <= line.start_date
+                and line.end_date <= app.end_date <= contract.end_date
+            )
+            events.setdefault(start, []).append((1, valid, order))
+            events.setdefault(end, []).append((-1, valid, order))
+
+        self.starts = sorted(events)
+        self.outcomes = []
+        active_valid: List[int] = []
+        active_invalid: List[int] = []
+        for point in self.starts:
+            for step, valid, order in events[point]:
+                active = active_valid if valid else active_invalid
+                if step > 0:
+                    insort(active, order)
+                else:
+                    del active[bisect_left(active, order)]
+            if active_valid:
+                first = active_valid[0]
+                self.outcomes.append((bisect_left(active_invalid, first), candidates[first]))
+            else:
+                self.outcomes.append((len(active_invalid), None))
+
+    def lookup(
+        self, appendix: Optional[AppendixRecord], event_date: date
+    ) -> Tuple[Optional[AppendixRecord], Optional[LineRecord], List[str]]:
+        position = bisect_right(self.starts, event_date.toordinal()) - 1
+        invalid, match = self.outcomes[position] if position >= 0 else (0, None)
+        reasons = ["date_hierarchy_invalid"] * invalid
+        if match is None:
+            reasons.append("no_active_line_for_product")
+            return appendix, None, reasons
+        return match[0], match[1], reasons
+
+
+def record_coverage_changes(db: Session, contract_ids: Iterable[int]) -> None:
+    execute_many(
+        db,
+        insert(models.CoverageChange.__table__),
+        [{"contract_id": contract_id} for contract_id in sorted(set(contract_ids))],
+    )
+    prune_coverage_changes(db)
+
+
+def prune_coverage_changes(db: Session) -> None:
+    table = models.CoverageChange.__table__
+    last_id = select(func.max(table.c.id)).scalar_subquery()
+    db.execute(delete(table).where(table.c.id <= last_id - COVERAGE_CHANGES_KEEP))
+
+
+def contract_rows(db: Session, contract_ids: Iterable[int]) -> Tuple[list, list, list]:
+    contracts = []
+    appendices = []
+    lines = []
+    for chunk in chunked(contract_ids):
+        contracts.extend(db.query(*CONTRACT_COLUMNS).filter(models.Contract.id.in_(chunk)))
+        appendices.extend(
+            db.query(*APPENDIX_COLUMNS).filter(models.Appendix.contract_id.in_(chunk)).order_by(models.Appendix.id)
+        )
+    for chunk in chunked([row.id for row in appendices]):
+        lines.extend(db.query(*LINE_COLUMNS).filter(models.ContractLine.appendix_id.in_(chunk)))
+    return contracts, appendices, lines
+
+
+def contract_record(row) -> ContractRecord:
+    return ContractRecord(row.id, row.start_date, row.end_date, row.status)
+
+
+def appendix_record(row) -> AppendixRecord:
+    return AppendixRecord(row.id, row.contract_id, row.start_date, row.end_date, row.status)
+
+
+def line_record(row) -> LineRecord:
+    return LineRecord(
+        row.id,
+        row.appendix_id,
+        row.product_id,
+        row.start_date,
+        row.end_date,
+        row.status,
+        row.warranty_start_rule,
+        row.warranty_duration_months,
+        row.warranty_options,
+        row.out_of_warranty_options,
+        row.required_inputs,
+    )
+
+
+class CoverageIndex:
+    def __init__(self, session_factory: Optional[sessionmaker] = None, refresh_seconds: float = 0.0) -> None:
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self.change_id = 0
+        self.checked_at = 0.0
+        self.clear()
+
+    def clear(self) -> None:
+        self._contracts: Dict[int, ContractRecord] = {}
+        self._appendices: Dict[int, AppendixRecord] = {}
+        self._lines: Dict[Tuple[int, int], LineRecord] = {}
+        self._by_contract_product: Dict[Tuple[int, int], Tuple[Tuple[AppendixRecord, LineRecord], ...]] = {}
+        self._intervals: Dict[Tuple[int, int], LineIntervals] = {}
+        self._contract_appendices: Dict[int, Set[int]] = {}
+        self._contract_products: Dict[int, Set[int]] = {}
+        self._missing: Set[Tuple[str, int]] = set()
+
+    def load(self, db: Session) -> None:
+        change_id = db.query(func.max(models.CoverageChange.id)).scalar() or 0
+        fresh = CoverageIndex()
+        fresh._fill(
+            db.query(*CONTRACT_COLUMNS).all(),
+            db.query(*APPENDIX_COLUMNS).all(),
+            db.query(*LINE_COLUMNS).all(),
+        )
+
+        with self._lock:
+            self._contracts = fresh._contracts
+            self._appendices = fresh._appendices
+            self._lines = fresh._lines
+            self._by_contract_product = fresh._by_contract_product
+            self._intervals = {}
+            self._contract_appendices = fresh._contract_appendices
+            self._contract_products = fresh._contract_products
+            self._missing = set()
+            self.change_id = change_id
+            self.checked_at = time.monotonic()
+
+    def refresh_due(self) -> bool:
+        return self.session_factory is not None and time.monotonic() - self.checked_at >= self.refresh_seconds
+
+    def refresh(self) -> Optional[List[int]]:
+        if not self._refresh_lock.acquire(blocking=False):
+            return []
+        try:
+            self.checked_at = time.monotonic()
+            db = self.session_factory()
+            try:
+                changes = db.execute(
+                    select(models.CoverageChange.id, models.CoverageChange.contract_id)
+                    .where(models.CoverageChange.id > self.change_id)
+                    .order_by(models.CoverageChange.id)
+                ).all()
+                if not changes:
+                    return []
+                first_id = db.query(func.min(models.CoverageChange.id)).scalar()
+                if first_id > self.change_id + 1:
+                    self.load(db)
+                    return None
+                contract_ids = sorted({row.contract_id for row in changes})
+                self.reload_contracts(db, contract_ids)
+                self._missing = set()
+                self.change_id = changes[-1].id
+                return contract_ids
+            finally:
+                db.close()
+        finally:
+            self._refresh_lock.release()
+
+    def reload_contracts(self, db: Session, contract_ids: Iterable[int]) -> None:
+        contract_ids = list(contract_ids)
+        contracts, appendices, lines = contract_rows(db, contract_ids)
+        with self._lock:
+            for contract_id in contract_ids:
+                self._drop_contract(contract_id)
+            self._fill(contracts, appendices, lines)
+
+    def _drop_contract(self, contract_id: int) -> None:
+        self._contracts.pop(contract_id, None)
+        products = self._contract_products.pop(contract_id, set())
+        for product_id in products:
+            self._by_contract_product.pop((contract_id, product_id), None)
+            self._intervals.pop((contract_id, product_id), None)
+        for appendix_id in self._contract_appendices.pop(contract_id, set()):
+            self._appendices.pop(appendix_id, None)
+            for product_id in products:
+                self._lines.pop((appendix_id, product_id), None)
+
+    def needs_lookup(self, contract_id: Optional[int], appendix_id: Optional[int]) -> bool:
+        if self.session_factory is None:
+            return False
+        if appendix_id is not None:
+            return appendix_id not in self._appendices and ("appendix", appendix_id) not in self._missing
+        if contract_id is not None:
+            return contract_id not in self._contracts and ("contract", contract_id) not in self._missing
+        return False
+
+    def load_missing(self, contract_id: Optional[int] = None, appendix_id: Optional[int] = None) -> None:
+        if not self.needs_lookup(contract_id, appendix_id):
+            return
+        if len(self._missing) >= MISSING_MAX_ENTRIES:
+            self._missing = set()
+        db = self.session_factory()
+        try:
+            if appendix_id is not None:
+                contract_id = db.query(models.Appendix.contract_id).filter(models.Appendix.id == appendix_id).scalar()
+                if contract_id is None:
+                    self._missing.add(("appendix", appendix_id))
+                    return
+            self.reload_contracts(db, [contract_id])
+            if contract_id not in self._contracts:
+                self._missing.add(("contract", contract_id))
+        finally:
+            db.close()
+
+    @classmethod
+    def for_requests(
+        cls,
+        db: Session,
+        contract_ids: Set[int],
+        appendix_ids: Set[int],
+        product_ids: Set[int],
+    ) -> "CoverageIndex":
+        appendices = {}
+        for chunk in chunked(appendix_ids):
+            for row in db.query(*APPENDIX_COLUMNS).filter(models.Appendix.id.in_(chunk)):
+                appendices[row.id] = row
+
+        contract_ids = set(contract_ids) | {row.contract_id for row in appendices.values()}
+        contracts = []
+        for chunk in chunked(contract_ids):
+            contracts.extend(db.query(*CONTRACT_COLUMNS).filter(models.Contract.id.in_(chunk)))
+        for chunk in chunked(contract_ids):
+            for row in db.query(*APPENDIX_COLUMNS).filter(models.Appendix.contract_id.in_(chunk)):
+                appendices[row.id] = row
+
+        lines = []
+        for chunk in chunked(appendices):
+            query = db.query(*LINE_COLUMNS).filter(models.ContractLine.appendix_id.in_(chunk))
+            if len(product_ids) <= IN_CHUNK_SIZE:
+                query = query.filter(models.ContractLine.product_id.in_(sorted(product_ids)))
+            lines.extend(row for row in query if row.product_id in product_ids)
+
+        index = cls()
+        index._fill(contracts, sorted(appendices.values(), key=lambda row: row.id), lines)
+        return index
+
+    def _fill(self, contracts, appendices, lines) -> None:
+        for row in contracts:
+            self._contracts[row.id] = contract_record(row)
+        for row in appendices:
+            self._put_appendix(appendix_record(row))
+        for row in lines:
+            self._put_line(line_record(row))
+
+    def add_records(
+        self,
+        contracts: Iterable[ContractRecord],
+        appendices: Iterable[AppendixRecord],
+        lines: Iterable[LineRecord],
+    ) -> None:
+        with self._lock:
+            for contract in contracts:
+                self._contracts[contract.id] = contract
+            for appendix in appendices:
+                self._put_appendix(appendix)
+            for line in lines:
+                self._put_line(line)
+
+    def add_contract(self, contract: models.Contract) -> None:
+        with self._lock:
+            self._contracts[contract.id] = contract_record(contract)
+
+    def add_appendix(self, appendix: models.Appendix) -> None:
+        with self._lock:
+            self._put_appendix(appendix_record(appendix))
+
+    def add_line(self, line: models.ContractLine) -> None:
+        with self._lock:
+            self._put_line(line_record(line))
+
+    def _put_appendix(self, appendix: AppendixRecord) -> None:
+        self._appendices[appendix.id] = appendix
+        self._contract_appendices.setdefault(appendix.contract_id, set()).add(appendix.id)
+
+    def _put_line(self, line: LineRecord) -> None:
+        self._lines[(line.appendix_id, line.product_id)] = line
+        appendix = self._appendices.get(line.appendix_id)
+        if appendix is None:
+            return
+
+        key = (appendix.contract_id, line.product_id)
+        self._contract_products.setdefault(appendix.contract_id, set()).add(line.product_id)
+        candidates = [item for item in self._by_contract_product.get(key, ()) if item[1].id != line.id]
+        insort(candidates, (appendix, line), key=lambda item: item[0].id)
+        self._by_contract_product[key] = tuple(candidates)
+
+    def resolve(
+        self, contract_id: Optional[int], appendix_id: Optional[int]
+    ) -> Tuple[Optional[ContractRecord], Optional[AppendixRecord], List[str]]:
+        if appendix_id is not None:
+            self.load_missing(appendix_id=appendix_id)
+            appendix = self._appendices.get(appendix_id)
+            if appendix is None:
+                return None, None, ["appendix_not_found"]
+            return self._contracts.get(appendix.contract_id), appendix, []
+        if contract_id is not None:
+            self.load_missing(contract_id=contract_id)
+            contract = self._contracts.get(contract_id)
+            if contract is None:
+                return None, None, ["contract_not_found"]
+            return contract, None, []
+        return None, None, ["missing_contract_or_appendix"]
+
+    def select(
+        self,
+        contract: ContractRecord,
+        appendix: Optional[AppendixRecord],
+        product_id: int,
+        event_date: date,
+    ) -> Tuple[Optional[AppendixRecord], Optional[LineRecord], List[str]]:
+        if appendix is not None:
+            line = self._lines.get((appendix.id, product_id))
+            return match_line(contract, appendix, [(appendix, line)] if line is not None else [], event_date)
+
+        key = (contract.id, product_id)
+        candidates = self._by_contract_product.get(key)
+        if candidates is None:
+            return match_line(contract, appendix, (), event_date)
+        intervals = self._intervals.get(key)
+        if intervals is None or intervals.candidates is not candidates or intervals.contract is not contract:
+            intervals = self._intervals[key] = LineIntervals(contract, candidates)
+        return intervals.lookup(appendix, event_date)
+
+
+coverage_index = CoverageIndex(SessionLocal, settings.coverage_refresh_seconds)
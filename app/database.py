@@ -1,12 +1,97 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import Dict, Iterable, List, Optional
 
-DATABASE_URL = "sqlite:///./app.db"
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from app.config import Settings, settings
+
+engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+database_settings: Settings = settings
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={int(database_settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA journal_mode={database_settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={database_settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA cache_size={-int(database_settings.sqlite_cache_size_kib)}")
+    cursor.execute(f"PRAGMA mmap_size={int(database_settings.sqlite_mmap_size_bytes)}")
+    cursor.close()
+
+
+def configure_database(config: Settings) -> None:
+    global database_settings, engine, async_engine
+    if engine is not None:
+        engine.dispose()
+    database_settings = config
+    engine = None
+    async_engine = None
+    SessionLocal.configure(bind=None)
+    AsyncSessionLocal.configure(bind=None)
+
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+    )
+
+
+def pool_options(url: str, queue_pool=None) -> Dict[str, object]:
+    if is_memory_sqlite(url):
+        return {"poolclass": StaticPool}
+    options: Dict[str, object] = {
+        "pool_size": database_settings.db_pool_size,
+        "max_overflow": database_settings.db_max_overflow,
+    }
+    if queue_pool is not None:
+        options["poolclass"] = queue_pool
+    return options
+
+
+def get_engine() -> Engine:
+    global engine
+    if engine is None:
+        url = database_settings.database_url
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+            **pool_options(url),
+        )
+        if database_settings.sqlite_tuning and engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", apply_sqlite_pragmas)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global async_engine
+    if async_engine is None:
+        url = database_settings.resolved_async_database_url()
+        async_engine = create_async_engine(url, **pool_options(url, AsyncAdaptedQueuePool))
+        if database_settings.sqlite_tuning and async_engine.dialect.name == "sqlite":
+            event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values: Iterable, size: int = IN_CHUNK_SIZE) -> Iterable[List]:
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def execute_many(db: Session, statement, rows: List[Dict[str, object]]) -> None:
+    if rows:
+        db.connection().execute(statement, rows)
@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+from app.config import settings
+from app.services import WARRANTY_START_INPUTS, evaluate_coverage
+
+DecisionKey = Tuple[Hashable, ...]
+Dependency = Tuple[str, int]
+
+
+class DecisionCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries: "OrderedDict[DecisionKey, Tuple[Dict[str, object], Tuple[Dependency, ...]]]" = OrderedDict()
+            self._by_dependency: Dict[Dependency, Set[DecisionKey]] = {}
+            self.generation += 1
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    @staticmethod
+    def key(
+        contract_id: Optional[int],
+        appendix_id: Optional[int],
+        product_id: int,
+        event_date: date,
+        inputs: Dict[str, Optional[object]],
+    ) -> DecisionKey:
+        normalized = tuple(
+            [(name, value if name in WARRANTY_START_INPUTS else value is not None) for name, value in inputs.items()]
+        )
+        return contract_id, appendix_id, product_id, event_date, normalized
+
+    def get(self, key: DecisionKey) -> Optional[Dict[str, object]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: DecisionKey, decision: Dict[str, object], generation: int) -> None:
+        if self.max_entries <= 0 or decision["resolved_contract_id"] is None:
+            return
+        dependencies = tuple(
+            (kind, decision[f"resolved_{kind}_id"])
+            for kind in ("contract", "appendix", "line")
+            if decision[f"resolved_{kind}_id"] is not None
+        )
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (decision, dependencies)
+            self._entries.move_to_end(key)
+            for dependency in dependencies:
+                self._by_dependency.setdefault(dependency, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(
+        self,
+        contract_id: Optional[int] = None,
+        appendix_id: Optional[int] = None,
+        line_id: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            self.generation += 1
+            for dependency in (("contract", contract_id), ("appendix", appendix_id), ("line", line_id)):
+                for key in self._by_dependency.pop(dependency, set()):
+                    if key in self._entries:
+                        self._drop(key)
+                        self.invalidations += 1
+
+    def _drop(self, key: DecisionKey) -> None:
+        _, dependencies = self._entries.pop(key)
+        for dependency in dependencies:
+            keys = self._by_dependency.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_dependency[dependency]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+decision_cache = DecisionCache(settings.decision_cache_max_entries)
+
+
+def sync_coverage_index(index) -> None:
+    if index.refresh_due():
+        contract_ids = index.refresh()
+        if contract_ids is None:
+            decision_cache.clear()
+            return
+        for contract_id in contract_ids:
+            decision_cache.invalidate(contract_id=contract_id)
+
+
+def cached_coverage_decision(
+    lookup,
+    contract_id: Optional[int],
+    appendix_id: Optional[int],
+    product_id: int,
+    event_date: date,
+    inputs: Dict[str, Optional[object]],
+) -> Dict[str, object]:
+    key = decision_cache.key(contract_id, appendix_id, product_id, event_date, inputs)
+    decision = decision_cache.get(key)
+    if decision is None:
+        generation = decision_cache.generation
+        decision = evaluate_coverage(lookup, contract_id, appendix_id, product_id, event_date, inputs)
+        decision_cache.put(key, decision, generation)
+    return decision
@@ -0,0 +1,230 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "orm_seconds", "service_seconds", "orm_depth", "service_depth")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.orm_seconds = 0.0
+        self.service_seconds = 0.0
+        self.orm_depth = 0
+        self.service_depth = 0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return ", ".join(
+            (
+                f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+                f"orm;dur={self.orm_seconds * 1000:.2f}",
+                f"svc;dur={self.service_seconds * 1000:.2f}",
+                f"app;dur={total_seconds * 1000:.2f}",
+            )
+        )
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_stats", default=None)
+def instrumented(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = current_stats.get()
+        if stats is None or stats.service_depth:
+            return fn(*args, **kwargs)
+        stats.service_depth += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.service_seconds += time.perf_counter() - started
+            stats.service_depth -= 1
+
+    return wrapper
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if current_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = current_stats.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - started.pop()
+
+
+def time_orm_execute(orm_execute_state):
+    stats = current_stats.get()
+    options = orm_execute_state.execution_options
+    if (
+        stats is None
+        or stats.orm_depth
+        or not orm_execute_state.is_select
+        or options.get("yield_per")
+        or options.get("stream_results")
+    ):
+        return None
+
+    stats.orm_depth += 1
+    db_before = stats.db_seconds
+    started = time.perf_counter()
+    try:
+        frozen = orm_execute_state.invoke_statement().freeze()
+    finally:
+        stats.orm_seconds += time.perf_counter() - started - (stats.db_seconds - db_before)
+        stats.orm_depth -= 1
+    return frozen()
+
+
+LISTENERS = (
+    (Engine, "before_cursor_execute", before_cursor_execute),
+    (Engine, "after_cursor_execute", after_cursor_execute),
+    (Session, "do_orm_execute", time_orm_execute),
+)
+running_apps = 0
+
+
+class RouteMetrics:
+    __slots__ = ("count", "errors", "latency_ms", "buckets", "queries", "db_ms", "orm_ms", "service_ms")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.queries = 0
+        self.db_ms = 0.0
+        self.orm_ms = 0.0
+        self.service_ms = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        latency_ms = seconds * 1000
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.count += 1
+            metrics.errors += status >= 500
+            metrics.latency_ms += latency_ms
+            metrics.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            metrics.queries += stats.queries
+            metrics.db_ms += stats.db_seconds * 1000
+            metrics.orm_ms += stats.orm_seconds * 1000
+            metrics.service_ms += stats.service_seconds * 1000
+
+    def snapshot(self) -> Dict[str, object]:
+        routes = []
+        with self._lock:
+            for (method, route), metrics in sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0])):
+                cumulative = 0
+                buckets = {}
+                for bound, hits in zip(LATENCY_BUCKETS_MS + ("+Inf",), metrics.buckets):
+                    cumulative += hits
+                    buckets[str(bound)] = cumulative
+                routes.append(
+                    {
+                        "method": method,
+                        "route": route,
+                        "count": metrics.count,
+                        "errors": metrics.errors,
+                        "latency_ms": {"sum": round(metrics.latency_ms, 3), "buckets": buckets},
+                        "db_queries": metrics.queries,
+                        "db_ms": round(metrics.db_ms, 3),
+                        "orm_ms": round(metrics.orm_ms, 3),
+                        "service_ms": round(metrics.service_ms, 3),
+                    }
+                )
+        return {"routes": routes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes = {}
+
+
+metrics_registry = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            route = scope.get("route")
+            self.registry.observe(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+                time.perf_counter() - started,
+                stats,
+            )
+
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def metrics() -> Dict[str, object]:
+    return metrics_registry.snapshot()
+
+
+def start() -> None:
+    global running_apps
+    running_apps += 1
+    if running_apps == 1:
+        for target, name, fn in LISTENERS:
+            event.listen(target, name, fn)
+
+
+def stop() -> None:
+    global running_apps
+    running_apps -= 1
+    if running_apps == 0:
+        for target, name, fn in LISTENERS:
+            event.remove(target, name, fn)
+
+
+def install(app) -> None:
+    app.add_middleware(InstrumentationMiddleware)
+    app.include_router(router)
@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, event, func, insert, not_, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal, execute_many, get_engine
+from app.migrations import upgrade
+from app.services import KPI_TYPES, kpi_alert
+
+ALERT_YIELD_PER = 5000
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+ContractRange = Tuple[int, int]
+KPIPoint = Tuple[int, str, date, int, int]
+
+ALERT_COLUMNS = (
+    models.KPIAlertRecord.kpi_type,
+    models.KPIAlertRecord.date,
+    models.KPIAlertRecord.alert_level,
+    models.KPIAlertRecord.delta_percent,
+    models.KPIAlertRecord.spike,
+)
+
+# Strictly inside the GREEN band (and therefore no spike); rows on the band edge
+# still go through kpi_alert so the float thresholds stay authoritative.
+certainly_green = and_(
+    models.KPIDaily.expected_value > 0,
+    func.abs(models.KPIDaily.actual_value - models.KPIDaily.expected_value) * 100
+    < models.KPIDaily.expected_value * 5,
+)
+
+
+def portfolio_alerts_statement(
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    contract_range: Optional[ContractRange] = None,
+):
+    statement = select(
+        models.KPIDaily.contract_id,
+        models.KPIDaily.kpi_type,
+        models.KPIDaily.date,
+        models.KPIDaily.expected_value,
+        models.KPIDaily.actual_value,
+    ).where(
+        models.KPIDaily.kpi_type.in_(sorted(KPI_TYPES)),
+        models.KPIDaily.expected_value != models.KPIDaily.actual_value,
+        not_(certainly_green),
+    )
+    if client_id is not None:
+        statement = statement.join(models.Contract, models.Contract.id == models.KPIDaily.contract_id).where(
+            models.Contract.client_id == client_id
+        )
+    if contract_range is not None:
+        statement = statement.where(models.KPIDaily.contract_id.between(*contract_range))
+    if date_from is not None:
+        statement = statement.where(models.KPIDaily.date >= date_from)
+    if date_to is not None:
+        statement = statement.where(models.KPIDaily.date <= date_to)
+    return statement.order_by(models.KPIDaily.contract_id, models.KPIDaily.kpi_type, models.KPIDaily.date)
+
+
+def scan_portfolio_alerts(
+    db: Session,
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    contract_range: Optional[ContractRange] = None,
+) -> Iterator[Dict[str, object]]:
+    statement = portfolio_alerts_statement(client_id, date_from, date_to, contract_range)
+    for contract_id, kpi_type, day, expected_value, actual_value in db.execute(
+        statement.execution_options(yield_per=ALERT_YIELD_PER)
+    ):
+        delta_percent, alert_level, spike = kpi_alert(expected_value, actual_value)
+        if alert_level != "GREEN" or spike:
+            yield {
+                "contract_id": contract_id,
+                "kpi_type": kpi_type,
+                "date": day,
+                "alert_level": alert_level,
+                "delta_percent": delta_percent,
+                "spike": spike,
+            }
+
+
+def alert_rows(points: Iterable[KPIPoint]) -> List[Dict[str, object]]:
+    rows = []
+    for contract_id, kpi_type, day, expected_value, actual_value in points:
+        delta_percent, alert_level, spike = kpi_alert(expected_value, actual_value)
+        if alert_level != "GREEN" or spike:
+            rows.append(
+                {
+                    "contract_id": contract_id,
+                    "kpi_type": kpi_type,
+                    "date": day,
+                    "alert_level": alert_level,
+                    "delta_percent": delta_percent,
+                    "spike": spike,
+                }
+            )
+    return rows
+
+
+def store_kpi_alerts(db: Session, points: List[KPIPoint]) -> List[Dict[str, object]]:
+    table = models.KPIAlertRecord.__table__
+    execute_many(
+        db,
+        delete(table).where(
+            table.c.contract_id == bindparam("key_contract_id"),
+            table.c.kpi_type == bindparam("key_kpi_type"),
+            table.c.date == bindparam("key_date"),
+        ),
+        [{"key_contract_id": point[0], "key_kpi_type": point[1], "key_date": point[2]} for point in points],
+    )
+    rows = alert_rows(points)
+    execute_many(db, insert(table), rows)
+    db.info.setdefault("pending_alerts", []).extend(rows)
+    return rows
+
+
+def replace_contract_alerts(db: Session, contract_id: int, points: Iterable[KPIPoint]) -> None:
+    db.query(models.KPIAlertRecord).filter(models.KPIAlertRecord.contract_id == contract_id).delete(
+        synchronize_session=False
+    )
+    execute_many(db, insert(models.KPIAlertRecord.__table__), alert_rows(points))
+
+
+def backfill_kpi_alerts(db: Session) -> int:
+    written = 0
+    rows: List[Dict[str, object]] = []
+    for alert in scan_portfolio_alerts(db):
+        rows.append(alert)
+        if len(rows) == ALERT_YIELD_PER:
+            execute_many(db, insert(models.KPIAlertRecord.__table__), rows)
+            written += len(rows)
+            rows = []
+    execute_many(db, insert(models.KPIAlertRecord.__table__), rows)
+    db.commit()
+    return written + len(rows)
+
+
+def contract_alerts_statement(contract_id: int):
+    return (
+        select(*ALERT_COLUMNS)
+        .where(models.KPIAlertRecord.contract_id == contract_id)
+        .order_by(models.KPIAlertRecord.kpi_type, models.KPIAlertRecord.date)
+    )
+
+
+def contract_alerts(db: Session, contract_id: int) -> List[Dict[str, object]]:
+    return [row._asdict() for row in db.execute(contract_alerts_statement(contract_id))]
+
+
+class AlertBroker:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def publish(self, alerts: List[Dict[str, object]]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(offer_alerts, queue, alerts)
+            except RuntimeError:
+                self.unsubscribe(queue)
+
+
+def offer_alerts(queue: asyncio.Queue, alerts: List[Dict[str, object]]) -> None:
+    for alert in alerts:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(alert)
+
+
+alert_broker = AlertBroker()
+
+
+def publish_pending_alerts(session: Session) -> None:
+    alerts = session.info.pop("pending_alerts", None)
+    if alerts:
+        alert_broker.publish(alerts)
+
+
+def discard_pending_alerts(session: Session) -> None:
+    session.info.pop("pending_alerts", None)
+
+
+event.listen(Session, "after_commit", publish_pending_alerts)
+event.listen(Session, "after_rollback", discard_pending_alerts)
+
+
+def contract_shards(db: Session, shards: int, client_id: Optional[int] = None) -> List[ContractRange]:
+    query = db.query(models.Contract.id).order_by(models.Contract.id)
+    if client_id is not None:
+        query = query.filter(models.Contract.client_id == client_id)
+    contract_ids = [row.id for row in query]
+
+    size = -(-len(contract_ids) // max(shards, 1))
+    return [
+        (contract_ids[start], contract_ids[min(start + size, len(contract_ids)) - 1])
+        for start in range(0, len(contract_ids), size or 1)
+    ]
+
+
+def scan_shard(
+    client_id: Optional[int], date_from: Optional[date], date_to: Optional[date], contract_range: ContractRange
+) -> List[Dict[str, object]]:
+    db = SessionLocal()
+    try:
+        return list(scan_portfolio_alerts(db, client_id, date_from, date_to, contract_range))
+    finally:
+        db.close()
+
+
+def reset_engine() -> None:
+    get_engine().dispose(close=False)
+
+
+def scan_portfolio(
+    workers: int = 1,
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Iterator[Dict[str, object]]:
+    db = SessionLocal()
+    try:
+        if workers <= 1:
+            yield from scan_portfolio_alerts(db, client_id, date_from, date_to)
+            return
+        shards = contract_shards(db, workers, client_id)
+    finally:
+        db.close()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=reset_engine) as pool:
+        futures = [pool.submit(scan_shard, client_id, date_from, date_to, shard) for shard in shards]
+        for future in futures:
+            yield from future.result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scan KPI alerts for every contract and write them as NDJSON.")
+    parser.add_argument("--client-id", type=int)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--workers", type=int, default=1, help="shard contracts across this many processes")
+    parser.add_argument("--output", help="write alerts to this file instead of stdout")
+    args = parser.parse_args()
+
+    upgrade(get_engine())
+    counts = {"ORANGE": 0, "RED": 0}
+    spikes = 0
+    handle = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for alert in scan_portfolio(args.workers, args.client_id, args.date_from, args.date_to):
+            counts[alert["alert_level"]] += 1
+            spikes += alert["spike"]
+            handle.write(json.dumps({**alert, "date": alert["date"].isoformat()}) + "\n")
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+    print(f"alerts: {counts['ORANGE']} orange, {counts['RED']} red, {spikes} spikes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
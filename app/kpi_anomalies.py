@@ -0,0 +1,173 @@
+import math
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import chunked, execute_many
+
+ANOMALY_ALPHA = 0.1
+ANOMALY_Z_THRESHOLD = 3.0
+ANOMALY_WARMUP = 14
+ANOMALY_MIN_STD = 1.0
+
+Stream = Tuple[int, str]
+ActualPoint = Tuple[int, str, date, int]
+
+ANOMALY_COLUMNS = (
+    models.KPIAnomaly.kpi_type,
+    models.KPIAnomaly.date,
+    models.KPIAnomaly.actual_value,
+    models.KPIAnomaly.mean,
+    models.KPIAnomaly.std,
+    models.KPIAnomaly.z_score,
+)
+
+
+class StreamState:
+    __slots__ = ("last_date", "count", "mean", "variance")
+
+    def __init__(self, last_date: Optional[date] = None, count: int = 0, mean: float = 0.0, variance: float = 0.0):
+        self.last_date = last_date
+        self.count = count
+        self.mean = mean
+        self.variance = variance
+
+    def observe(self, day: date, value: int) -> Optional[Tuple[float, float, float]]:
+        anomaly = None
+        if self.count == 0:
+            self.mean = float(value)
+        else:
+            std = max(math.sqrt(self.variance), ANOMALY_MIN_STD)
+            diff = value - self.mean
+            z_score = diff / std
+            if self.count >= ANOMALY_WARMUP:
+                if abs(z_score) >= ANOMALY_Z_THRESHOLD:
+                    anomaly = (self.mean, std, z_score)
+                limit = ANOMALY_Z_THRESHOLD * std
+                diff = min(max(diff, -limit), limit)
+            increment = ANOMALY_ALPHA * diff
+            self.mean += increment
+            self.variance = (1 - ANOMALY_ALPHA) * (self.variance + diff * increment)
+        self.count += 1
+        self.last_date = day
+        return anomaly
+
+
+def load_stream_states(db: Session, streams: Iterable[Stream]) -> Dict[Stream, StreamState]:
+    table = models.KPIAnomalyState.__table__
+    wanted = set(streams)
+    states: Dict[Stream, StreamState] = {}
+    for chunk in chunked({contract_id for contract_id, _ in wanted}):
+        for row in db.execute(select(table).where(table.c.contract_id.in_(chunk))):
+            if (row.contract_id, row.kpi_type) in wanted:
+                states[(row.contract_id, row.kpi_type)] = StreamState(row.last_date, row.count, row.mean, row.variance)
+    return states
+
+
+def advance_streams(
+    states: Dict[Stream, StreamState], points: Iterable[ActualPoint]
+) -> Tuple[List[Stream], List[Dict[str, object]]]:
+    changed = []
+    anomalies = []
+    for stream, stream_points in groupby(sorted(points), key=itemgetter(0, 1)):
+        state = states.setdefault(stream, StreamState())
+        advanced = False
+        for contract_id, kpi_type, day, value in stream_points:
+            if state.last_date is not None and day <= state.last_date:
+                continue
+            advanced = True
+            anomaly = state.observe(day, value)
+            if anomaly is not None:
+                mean, std, z_score = anomaly
+                anomalies.append(
+                    {
+                        "contract_id": contract_id,
+                        "kpi_type": kpi_type,
+                        "date": day,
+                        "actual_value": value,
+                        "mean": round(mean, 2),
+                        "std": round(std, 2),
+                        "z_score": round(z_score, 2),
+                    }
+                )
+        if advanced:
+            changed.append(stream)
+    return changed, anomalies
+
+
+def save_stream_states(db: Session, states: Dict[Stream, StreamState], streams: List[Stream]) -> None:
+    table = models.KPIAnomalyState.__table__
+    execute_many(
+        db,
+        delete(table).where(
+            table.c.contract_id == bindparam("key_contract_id"),
+            table.c.kpi_type == bindparam("key_kpi_type"),
+        ),
+        [{"key_contract_id": contract_id, "key_kpi_type": kpi_type} for contract_id, kpi_type in streams],
+    )
+    execute_many(
+        db,
+        insert(table),
+        [
+            {
+                "contract_id": contract_id,
+                "kpi_type": kpi_type,
+                "last_date": states[(contract_id, kpi_type)].last_date,
+                "count": states[(contract_id, kpi_type)].count,
+                "mean": states[(contract_id, kpi_type)].mean,
+                "variance": states[(contract_id, kpi_type)].variance,
+            }
+            for contract_id, kpi_type in streams
+        ],
+    )
+
+
+def observe_kpi_actuals(db: Session, points: List[ActualPoint]) -> List[Dict[str, object]]:
+    states = load_stream_states(db, {(contract_id, kpi_type) for contract_id, kpi_type, _, _ in points})
+    changed, anomalies = advance_streams(states, points)
+    save_stream_states(db, states, changed)
+    execute_many(db, insert(models.KPIAnomaly.__table__), anomalies)
+    return anomalies
+
+
+def rebuild_anomaly_state(db: Session, contract_id: int) -> None:
+    for model in (models.KPIAnomalyState, models.KPIAnomaly):
+        db.execute(delete(model.__table__).where(model.__table__.c.contract_id == contract_id))
+
+    latest: Dict[Tuple[str, date], int] = {}
+    for kpi_type, day, value in db.execute(
+        select(models.KPIActual.kpi_type, models.KPIActual.date, models.KPIActual.actual_value)
+        .where(models.KPIActual.contract_id == contract_id)
+        .order_by(models.KPIActual.id)
+    ):
+        latest[(kpi_type, day)] = value
+
+    states: Dict[Stream, StreamState] = {}
+    changed, anomalies = advance_streams(
+        states, [(contract_id, kpi_type, day, value) for (kpi_type, day), value in latest.items()]
+    )
+    save_stream_states(db, states, changed)
+    execute_many(db, insert(models.KPIAnomaly.__table__), anomalies)
+
+
+def backfill_anomaly_state(db: Session) -> None:
+    for (contract_id,) in db.query(models.KPIActual.contract_id).distinct().order_by(models.KPIActual.contract_id):
+        rebuild_anomaly_state(db, contract_id)
+    db.commit()
+
+
+def contract_anomalies_statement(contract_id: int):
+    return (
+        select(*ANOMALY_COLUMNS)
+        .where(models.KPIAnomaly.contract_id == contract_id)
+        .order_by(models.KPIAnomaly.kpi_type, models.KPIAnomaly.date)
+    )
+
+
+def contract_anomalies(db: Session, contract_id: int) -> List[Dict[str, object]]:
+    return [row._asdict() for row in db.execute(contract_anomalies_statement(contract_id))]
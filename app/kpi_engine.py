@@ -0,0 +1,163 @@
+from datetime import date, timedelta
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import KPI_TYPES, build_kpi_series_columns, iter_kpi_series
+
+KPIColumns = Tuple[List[date], List[int], List[int]]
+
+EXPECTED = 0
+ACTUAL = 1
+
+GRANULARITIES = ("day", "week", "month")
+
+STREAM_YIELD_PER = 1000
+
+
+def kpi_rows_statement(contract_id: int):
+    expected = select(
+        models.KPIExpected.kpi_type.label("kpi_type"),
+        models.KPIExpected.date.label("date"),
+        models.KPIExpected.expected_value.label("value"),
+        literal(EXPECTED).label("source"),
+        models.KPIExpected.id.label("id"),
+    ).where(models.KPIExpected.contract_id == contract_id)
+    actual = select(
+        models.KPIActual.kpi_type,
+        models.KPIActual.date,
+        models.KPIActual.actual_value,
+        literal(ACTUAL),
+        models.KPIActual.id,
+    ).where(models.KPIActual.contract_id == contract_id)
+    rows = union_all(expected, actual).subquery()
+    return select(rows.c.kpi_type, rows.c.date, rows.c.value, rows.c.source).order_by(
+        rows.c.kpi_type, rows.c.date, rows.c.source, rows.c.id
+    )
+
+
+def fetch_kpi_columns(db: Session, contract_id: int) -> Dict[str, KPIColumns]:
+    columns: Dict[str, KPIColumns] = {}
+
+    for kpi_type, day, value, source in db.execute(kpi_rows_statement(contract_id)):
+        if kpi_type not in KPI_TYPES:
+            continue
+        dates, expected_values, actual_values = columns.setdefault(kpi_type, ([], [], []))
+        if not dates or dates[-1] != day:
+            dates.append(day)
+            expected_values.append(0)
+            actual_values.append(0)
+        if source == EXPECTED:
+            expected_values[-1] = value
+        else:
+            actual_values[-1] = value
+
+    return columns
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def kpi_series_statement(
+    contract_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    kpi_types: Optional[Iterable[str]] = None,
+):
+    selected = KPI_TYPES if kpi_types is None else KPI_TYPES & set(kpi_types)
+    branches = []
+    for table, first_day in (
+        (models.KPIMonthly, bucket_start(date_from, "month") if date_from is not None else None),
+        (models.KPIDaily, date_from),
+    ):
+        statement = select(
+            table.kpi_type,
+            table.date,
+            table.expected_value,
+            table.actual_value,
+            table.expected_cumulative,
+            table.actual_cumulative,
+        ).where(
+            table.contract_id == contract_id,
+            table.kpi_type.in_(sorted(selected)),
+        )
+        if first_day is not None:
+            statement = statement.where(table.date >= first_day)
+        if date_to is not None:
+            statement = statement.where(table.date <= date_to)
+        branches.append(statement)
+
+    rows = union_all(*branches)
+    return rows.order_by(rows.selected_columns.kpi_type, rows.selected_columns.date)
+
+
+def assemble_kpi_series(
+    rows, granularity: str = "day", kpi_types: Optional[Iterable[str]] = None
+) -> List[Tuple[str, List[Dict[str, object]]]]:
+    columns: Dict[str, KPIColumns] = {}
+    offsets: Dict[str, Tuple[int, int]] = {}
+    for kpi_type, day, expected_value, actual_value, expected_cumulative, actual_cumulative in rows:
+        if kpi_type not in columns:
+            columns[kpi_type] = ([], [], [])
+            offsets[kpi_type] = (expected_cumulative - expected_value, actual_cumulative - actual_value)
+        dates, expected_values, actual_values = columns[kpi_type]
+        day = bucket_start(day, granularity)
+        if not dates or dates[-1] != day:
+            dates.append(day)
+            expected_values.append(0)
+            actual_values.append(0)
+        expected_values[-1] += expected_value
+        actual_values[-1] += actual_value
+
+    return [
+        (kpi_type, build_kpi_series_columns(*columns.get(kpi_type, ([], [], [])), *offsets.get(kpi_type, (0, 0))))
+        for kpi_type in sorted(KPI_TYPES if kpi_types is None else KPI_TYPES & set(kpi_types))
+    ]
+
+
+def contract_kpi_series(
+    db: Session,
+    contract_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    granularity: str = "day",
+    kpi_types: Optional[Iterable[str]] = None,
+) -> List[Tuple[str, List[Dict[str, object]]]]:
+    rows = db.execute(kpi_series_statement(contract_id, date_from, date_to, kpi_types))
+    return assemble_kpi_series(rows, granularity, kpi_types)
+
+
+def stream_kpi_series(
+    db: Session,
+    contract_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    granularity: str = "day",
+    kpi_types: Optional[Iterable[str]] = None,
+) -> Iterator[Tuple[str, Dict[str, object]]]:
+    statement = kpi_series_statement(contract_id, date_from, date_to, kpi_types)
+    rows = db.execute(statement.execution_options(yield_per=STREAM_YIELD_PER))
+
+    for kpi_type, stream in groupby(rows, key=itemgetter(0)):
+        first = next(stream)
+        buckets = groupby(chain((first,), stream), key=lambda row: bucket_start(row.date, granularity))
+        points = (
+            (day, sum(row.expected_value for row in bucket), sum(row.actual_value for row in bucket))
+            for day, bucket in ((day, list(bucket)) for day, bucket in buckets)
+        )
+        for point in iter_kpi_series(
+            points,
+            first.expected_cumulative - first.expected_value,
+            first.actual_cumulative - first.actual_value,
+        ):
+            yield kpi_type, point
+
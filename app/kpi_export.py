@@ -0,0 +1,210 @@
+import argparse
+import csv
+import io
+import sys
+from datetime import date
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal, get_engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+EXPORT_CHUNK_ROWS = 50000
+
+EXPORT_COLUMNS = ("contract_id", "kpi_type", "date", "granularity", "expected", "actual")
+
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def default_export_format() -> str:
+    return "arrow" if pa is not None else "csv"
+
+
+def export_format_available(export_format: str) -> bool:
+    return export_format == "csv" or (export_format in EXPORT_FORMATS and pa is not None)
+
+
+def kpi_export_statement(
+    contract_ids: Optional[Sequence[int]] = None,
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    branches = []
+    for table, granularity, first_day in (
+        (models.KPIMonthly, "month", date_from.replace(day=1) if date_from is not None else None),
+        (models.KPIDaily, "day", date_from),
+    ):
+        statement = select(
+            table.contract_id,
+            table.kpi_type,
+            table.date,
+            literal(granularity).label("granularity"),
+            table.expected_value,
+            table.actual_value,
+        )
+        if contract_ids:
+            statement = statement.where(table.contract_id.in_(sorted(set(contract_ids))))
+        if client_id is not None:
+            statement = statement.join(models.Contract, models.Contract.id == table.contract_id).where(
+                models.Contract.client_id == client_id
+            )
+        if first_day is not None:
+            statement = statement.where(table.date >= first_day)
+        if date_to is not None:
+            statement = statement.where(table.date <= date_to)
+        branches.append(statement)
+
+    rows = union_all(*branches)
+    columns = rows.selected_columns
+    return rows.order_by(columns.contract_id, columns.kpi_type, columns.date)
+
+
+def kpi_export_chunks(db: Session, statement, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[List[tuple]]:
+    result = db.connection().execute(statement.execution_options(yield_per=chunk_rows))
+    yield from result.partitions()
+
+
+class ChunkSink:
+    def __init__(self) -> None:
+        self.closed = False
+        self.position = 0
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def export_schema():
+    return pa.schema(
+        [
+            ("contract_id", pa.int64()),
+            ("kpi_type", pa.string()),
+            ("date", pa.date32()),
+            ("granularity", pa.string()),
+            ("expected", pa.int64()),
+            ("actual", pa.int64()),
+        ]
+    )
+
+
+def record_batch(schema, rows: List[tuple]):
+    columns = list(zip(*rows))
+    return pa.record_batch([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+
+def csv_bytes(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def arrow_bytes(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    schema = export_schema()
+    sink = ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(record_batch(schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_bytes(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    schema = export_schema()
+    sink = ChunkSink()
+    with pa.parquet.ParquetWriter(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(record_batch(schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {"arrow": arrow_bytes, "parquet": parquet_bytes, "csv": csv_bytes}
+
+
+def export_kpi_history(
+    db: Session,
+    export_format: str,
+    contract_ids: Optional[Sequence[int]] = None,
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Iterator[bytes]:
+    statement = kpi_export_statement(contract_ids, client_id, date_from, date_to)
+    for data in EXPORT_WRITERS[export_format](kpi_export_chunks(db, statement)):
+        if data:
+            yield data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export daily and compacted monthly KPI expected/actual values as Arrow, Parquet or CSV."
+    )
+    parser.add_argument(
+        "--format", dest="export_format", choices=sorted(EXPORT_FORMATS), default=default_export_format()
+    )
+    parser.add_argument("--contract-id", type=int, action="append", dest="contract_ids")
+    parser.add_argument("--client-id", type=int)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--output", help="write the export to this file instead of stdout")
+    args = parser.parse_args()
+
+    if not export_format_available(args.export_format):
+        parser.error(f"--format {args.export_format} requires pyarrow")
+
+    get_engine()
+    db = SessionLocal()
+    handle = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in export_kpi_history(
+            db, args.export_format, args.contract_ids, args.client_id, args.date_from, args.date_to
+        ):
+            handle.write(data)
+    finally:
+        if handle is not sys.stdout.buffer:
+            handle.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
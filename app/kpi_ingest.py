@@ -0,0 +1,78 @@
+from datetime import date
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import chunked, execute_many
+from app.kpi_rollup import apply_kpi_values
+
+KPI_TABLES = {
+    "expected": (models.KPIExpected.__table__, "expected_value"),
+    "actual": (models.KPIActual.__table__, "actual_value"),
+}
+
+WRITE_CHUNK_SIZE = 5000
+
+KPIKey = Tuple[int, str, date]
+
+
+def existing_contract_ids(db: Session, contract_ids: Iterable[int]) -> Set[int]:
+    found: Set[int] = set()
+    for chunk in chunked(set(contract_ids)):
+        found.update(row.id for row in db.query(models.Contract.id).filter(models.Contract.id.in_(chunk)))
+    return found
+
+
+def existing_kpi_keys(db: Session, source: str, keys: List[KPIKey]) -> Set[KPIKey]:
+    table, _ = KPI_TABLES[source]
+    wanted = set(keys)
+    contract_ids = sorted({contract_id for contract_id, _, _ in keys})
+    dates = sorted({day for _, _, day in keys})
+
+    rows = db.execute(
+        select(table.c.contract_id, table.c.kpi_type, table.c.date)
+        .where(table.c.contract_id.in_(contract_ids), table.c.date.in_(dates))
+        .distinct()
+    )
+    return {key for key in map(tuple, rows) if key in wanted}
+
+
+def ingest_kpi_values(db: Session, source: str, values: Dict[KPIKey, int]) -> Dict[str, int]:
+    table, value_column = KPI_TABLES[source]
+    insert_rows = insert(table)
+    update_rows = (
+        update(table)
+        .where(
+            table.c.contract_id == bindparam("key_contract_id"),
+            table.c.kpi_type == bindparam("key_kpi_type"),
+            table.c.date == bindparam("key_date"),
+        )
+        .values({value_column: bindparam("new_value")})
+    )
+
+    inserted = 0
+    updated = 0
+    keys = list(values)
+    for start in range(0, len(keys), WRITE_CHUNK_SIZE):
+        chunk = keys[start : start + WRITE_CHUNK_SIZE]
+        existing = existing_kpi_keys(db, source, chunk)
+
+        updates = [
+            {"key_contract_id": key[0], "key_kpi_type": key[1], "key_date": key[2], "new_value": values[key]}
+            for key in chunk
+            if key in existing
+        ]
+        inserts = [
+            {"contract_id": key[0], "kpi_type": key[1], "date": key[2], value_column: values[key]}
+            for key in chunk
+            if key not in existing
+        ]
+        execute_many(db, update_rows, updates)
+        execute_many(db, insert_rows, inserts)
+        updated += len(updates)
+        inserted += len(inserts)
+
+    apply_kpi_values(db, source, values)
+    return {"inserted": inserted, "updated": updated}
@@ -0,0 +1,172 @@
+import argparse
+from datetime import date
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal, chunked, execute_many, get_engine
+from app.kpi_engine import ACTUAL, EXPECTED
+from app.migrations import upgrade
+from app.services import KPI_TYPES, add_months
+
+COMPACT_CHUNK_CONTRACTS = 100
+COMPACT_YIELD_PER = 5000
+
+KPIKey = Tuple[int, str, date]
+MonthlyTotal = Tuple[date, int, int]
+
+DAILY_TABLES = (
+    models.KPIDaily.__table__,
+    models.KPIExpected.__table__,
+    models.KPIActual.__table__,
+    models.KPIAlertRecord.__table__,
+    models.KPIAnomaly.__table__,
+)
+
+
+def retention_cutoff(today: date, months: int) -> date:
+    return add_months(today.replace(day=1), -months)
+
+
+def monthly_totals(db: Session, contract_ids: Iterable[int]) -> Dict[Tuple[int, str], MonthlyTotal]:
+    table = models.KPIMonthly.__table__
+    totals: Dict[Tuple[int, str], MonthlyTotal] = {}
+    for chunk in chunked(set(contract_ids)):
+        last_month = (
+            select(table.c.contract_id, table.c.kpi_type, func.max(table.c.date).label("date"))
+            .where(table.c.contract_id.in_(chunk))
+            .group_by(table.c.contract_id, table.c.kpi_type)
+            .subquery()
+        )
+        for row in db.execute(
+            select(
+                table.c.contract_id,
+                table.c.kpi_type,
+                table.c.date,
+                table.c.expected_cumulative,
+                table.c.actual_cumulative,
+            ).join(
+                last_month,
+                and_(
+                    table.c.contract_id == last_month.c.contract_id,
+                    table.c.kpi_type == last_month.c.kpi_type,
+                    table.c.date == last_month.c.date,
+                ),
+            )
+        ):
+            totals[(row.contract_id, row.kpi_type)] = (row.date, row.expected_cumulative, row.actual_cumulative)
+    return totals
+
+
+def compacted_keys(db: Session, keys: Iterable[KPIKey]) -> List[KPIKey]:
+    keys = list(keys)
+    totals = monthly_totals(db, {contract_id for contract_id, _, _ in keys})
+    return [
+        (contract_id, kpi_type, day)
+        for contract_id, kpi_type, day in keys
+        if (contract_id, kpi_type) in totals and day.replace(day=1) <= totals[(contract_id, kpi_type)][0]
+    ]
+
+
+def raw_kpi_statement(contract_ids: List[int], before: date):
+    expected = select(
+        models.KPIExpected.contract_id.label("contract_id"),
+        models.KPIExpected.kpi_type.label("kpi_type"),
+        models.KPIExpected.date.label("date"),
+        models.KPIExpected.expected_value.label("value"),
+        literal(EXPECTED).label("source"),
+        models.KPIExpected.id.label("id"),
+    ).where(models.KPIExpected.contract_id.in_(contract_ids), models.KPIExpected.date < before)
+    actual = select(
+        models.KPIActual.contract_id,
+        models.KPIActual.kpi_type,
+        models.KPIActual.date,
+        models.KPIActual.actual_value,
+        literal(ACTUAL),
+        models.KPIActual.id,
+    ).where(models.KPIActual.contract_id.in_(contract_ids), models.KPIActual.date < before)
+    rows = union_all(expected, actual).subquery()
+    return select(rows.c.contract_id, rows.c.kpi_type, rows.c.date, rows.c.value, rows.c.source).order_by(
+        rows.c.contract_id, rows.c.kpi_type, rows.c.date, rows.c.source, rows.c.id
+    )
+
+
+def compact_contracts(db: Session, contract_ids: List[int], before: date) -> Tuple[int, int]:
+    totals = monthly_totals(db, contract_ids)
+    rows = db.execute(raw_kpi_statement(contract_ids, before).execution_options(yield_per=COMPACT_YIELD_PER))
+
+    months: List[Dict[str, object]] = []
+    days = 0
+    for (contract_id, kpi_type), stream in groupby(rows, key=lambda row: (row.contract_id, row.kpi_type)):
+        if kpi_type not in KPI_TYPES:
+            continue
+        _, expected_cumulative, actual_cumulative = totals.get((contract_id, kpi_type), (None, 0, 0))
+        for month, bucket in groupby(stream, key=lambda row: row.date.replace(day=1)):
+            values: Dict[date, List[int]] = {}
+            for row in bucket:
+                values.setdefault(row.date, [0, 0])[row.source] = row.value
+            expected_value = sum(value[EXPECTED] for value in values.values())
+            actual_value = sum(value[ACTUAL] for value in values.values())
+            expected_cumulative += expected_value
+            actual_cumulative += actual_value
+            days += len(values)
+            months.append(
+                {
+                    "contract_id": contract_id,
+                    "kpi_type": kpi_type,
+                    "date": month,
+                    "expected_value": expected_value,
+                    "actual_value": actual_value,
+                    "expected_cumulative": expected_cumulative,
+                    "actual_cumulative": actual_cumulative,
+                }
+            )
+
+    execute_many(db, insert(models.KPIMonthly.__table__), months)
+    for table in DAILY_TABLES:
+        db.execute(delete(table).where(table.c.contract_id.in_(contract_ids), table.c.date < before))
+    return days, len(months)
+
+
+def compact_kpi_history(db: Session, before: date, contract_ids: Optional[Iterable[int]] = None) -> Tuple[int, int]:
+    before = before.replace(day=1)
+    if contract_ids is None:
+        contract_ids = [row.id for row in db.query(models.Contract.id).order_by(models.Contract.id)]
+
+    days = 0
+    months = 0
+    for chunk in chunked(contract_ids, COMPACT_CHUNK_CONTRACTS):
+        compacted_days, compacted_months = compact_contracts(db, chunk, before)
+        db.commit()
+        days += compacted_days
+        months += compacted_months
+    return days, months
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compact daily KPI rows older than the retention window into monthly totals."
+    )
+    parser.add_argument(
+        "--months", type=int, default=settings.kpi_retention_months, help="months of daily rows to keep"
+    )
+    parser.add_argument("--before", type=date.fromisoformat, help="compact months before this date instead")
+    parser.add_argument("--contract-id", type=int, action="append", dest="contract_ids")
+    args = parser.parse_args()
+
+    before = args.before or retention_cutoff(date.today(), args.months)
+    upgrade(get_engine())
+    db = SessionLocal()
+    try:
+        days, months = compact_kpi_history(db, before, args.contract_ids)
+    finally:
+        db.close()
+    print(f"compacted {days} daily rows before {before.replace(day=1).isoformat()} into {months} monthly rows")
+
+
+if __name__ == "__main__":
+    main()
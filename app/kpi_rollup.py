@@ -0,0 +1,231 @@
+import argparse
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal, chunked, execute_many, get_engine
+from app.kpi_alerts import backfill_kpi_alerts, replace_contract_alerts, store_kpi_alerts
+from app.kpi_anomalies import backfill_anomaly_state, observe_kpi_actuals, rebuild_anomaly_state
+from app.kpi_engine import fetch_kpi_columns
+from app.kpi_retention import monthly_totals
+from app.migrations import upgrade
+
+VALUE_COLUMNS = {
+    "expected": ("expected_value", "expected_cumulative"),
+    "actual": ("actual_value", "actual_cumulative"),
+}
+
+
+def apply_kpi_value(db: Session, contract_id: int, kpi_type: str, day: date, source: str, value: int) -> None:
+    value_attr, cumulative_attr = VALUE_COLUMNS[source]
+    db.flush()
+    same_stream = (
+        models.KPIDaily.contract_id == contract_id,
+        models.KPIDaily.kpi_type == kpi_type,
+    )
+
+    row = db.query(models.KPIDaily).filter(*same_stream, models.KPIDaily.date == day).first()
+    if row is None:
+        previous = (
+            db.query(models.KPIDaily)
+            .filter(*same_stream, models.KPIDaily.date < day)
+            .order_by(models.KPIDaily.date.desc())
+            .first()
+        )
+        if previous is not None:
+            expected_base, actual_base = previous.expected_cumulative, previous.actual_cumulative
+        else:
+            _, expected_base, actual_base = monthly_totals(db, [contract_id]).get((contract_id, kpi_type), (None, 0, 0))
+        row = models.KPIDaily(
+            contract_id=contract_id,
+            kpi_type=kpi_type,
+            date=day,
+            expected_value=0,
+            actual_value=0,
+            expected_cumulative=expected_base,
+            actual_cumulative=actual_base,
+        )
+        db.add(row)
+
+    diff = value - getattr(row, value_attr)
+    setattr(row, value_attr, value)
+    setattr(row, cumulative_attr, getattr(row, cumulative_attr) + diff)
+    db.flush()
+    store_kpi_alerts(db, [(contract_id, kpi_type, day, row.expected_value, row.actual_value)])
+    if source == "actual":
+        observe_kpi_actuals(db, [(contract_id, kpi_type, day, value)])
+
+    if diff:
+        cumulative = getattr(models.KPIDaily, cumulative_attr)
+        db.query(models.KPIDaily).filter(*same_stream, models.KPIDaily.date > day).update(
+            {cumulative: cumulative + diff}, synchronize_session=False
+        )
+
+
+def apply_kpi_values(db: Session, source: str, values: Dict[Tuple[int, str, date], int]) -> None:
+    value_attr, _ = VALUE_COLUMNS[source]
+
+    streams: Dict[Tuple[int, str], Dict[date, int]] = {}
+    for (contract_id, kpi_type, day), value in values.items():
+        streams.setdefault((contract_id, kpi_type), {})[day] = value
+
+    by_since: Dict[Tuple[str, date], List[int]] = {}
+    for (contract_id, kpi_type), stream in streams.items():
+        by_since.setdefault((kpi_type, min(stream)), []).append(contract_id)
+
+    for (kpi_type, since), contract_ids in sorted(by_since.items()):
+        for chunk in chunked(contract_ids):
+            updates = {contract_id: streams[(contract_id, kpi_type)] for contract_id in chunk}
+            rewrite_kpi_streams(db, value_attr, kpi_type, since, updates)
+
+    if source == "actual":
+        observe_kpi_actuals(
+            db, [(contract_id, kpi_type, day, value) for (contract_id, kpi_type, day), value in values.items()]
+        )
+
+
+def rewrite_kpi_streams(
+    db: Session, value_attr: str, kpi_type: str, since: date, updates: Dict[int, Dict[date, int]]
+) -> None:
+    table = models.KPIDaily.__table__
+    in_streams = and_(table.c.contract_id.in_(sorted(updates)), table.c.kpi_type == kpi_type)
+
+    last_day = (
+        select(table.c.contract_id, func.max(table.c.date).label("date"))
+        .where(in_streams, table.c.date < since)
+        .group_by(table.c.contract_id)
+        .subquery()
+    )
+    base = {
+        row.contract_id: (row.expected_cumulative, row.actual_cumulative)
+        for row in db.execute(
+            select(table.c.contract_id, table.c.expected_cumulative, table.c.actual_cumulative).join(
+                last_day,
+                and_(
+                    table.c.contract_id == last_day.c.contract_id,
+                    table.c.kpi_type == kpi_type,
+                    table.c.date == last_day.c.date,
+                ),
+            )
+        )
+    }
+    for (contract_id, stream_type), totals in monthly_totals(db, updates).items():
+        if stream_type == kpi_type:
+            base.setdefault(contract_id, totals[1:])
+
+    days: Dict[int, Dict[date, Dict[str, int]]] = {contract_id: {} for contract_id in updates}
+    for row in db.execute(
+        select(table.c.contract_id, table.c.date, table.c.expected_value, table.c.actual_value).where(
+            in_streams, table.c.date >= since
+        )
+    ):
+        days[row.contract_id][row.date] = {
+            "expected_value": row.expected_value,
+            "actual_value": row.actual_value,
+        }
+    for contract_id, stream in updates.items():
+        for day, value in stream.items():
+            days[contract_id].setdefault(day, {"expected_value": 0, "actual_value": 0})[value_attr] = value
+
+    rows: List[Dict[str, object]] = []
+    for contract_id, stream in days.items():
+        expected_cumulative, actual_cumulative = base.get(contract_id, (0, 0))
+        for day in sorted(stream):
+            point = stream[day]
+            expected_cumulative += point["expected_value"]
+            actual_cumulative += point["actual_value"]
+            rows.append(
+                {
+                    "contract_id": contract_id,
+                    "kpi_type": kpi_type,
+                    "date": day,
+                    "expected_value": point["expected_value"],
+                    "actual_value": point["actual_value"],
+                    "expected_cumulative": expected_cumulative,
+                    "actual_cumulative": actual_cumulative,
+                }
+            )
+
+    db.execute(delete(table).where(in_streams, table.c.date >= since))
+    execute_many(db, insert(table), rows)
+    changed = []
+    for contract_id, stream in updates.items():
+        for day in stream:
+            point = days[contract_id][day]
+            changed.append((contract_id, kpi_type, day, point["expected_value"], point["actual_value"]))
+    store_kpi_alerts(db, changed)
+
+
+def rebuild_kpi_rollup(db: Session, contract_ids: Optional[Iterable[int]] = None) -> int:
+    if contract_ids is None:
+        contract_ids = [row.id for row in db.query(models.Contract.id).order_by(models.Contract.id)]
+
+    written = 0
+    for contract_id in contract_ids:
+        db.query(models.KPIDaily).filter(models.KPIDaily.contract_id == contract_id).delete(
+            synchronize_session=False
+        )
+        rows = []
+        totals = monthly_totals(db, [contract_id])
+        for kpi_type, (dates, expected_values, actual_values) in fetch_kpi_columns(db, contract_id).items():
+            _, expected_cumulative, actual_cumulative = totals.get((contract_id, kpi_type), (None, 0, 0))
+            for day, expected_value, actual_value in zip(dates, expected_values, actual_values):
+                expected_cumulative += expected_value
+                actual_cumulative += actual_value
+                rows.append(
+                    {
+                        "contract_id": contract_id,
+                        "kpi_type": kpi_type,
+                        "date": day,
+                        "expected_value": expected_value,
+                        "actual_value": actual_value,
+                        "expected_cumulative": expected_cumulative,
+                        "actual_cumulative": actual_cumulative,
+                    }
+                )
+        db.bulk_insert_mappings(models.KPIDaily, rows)
+        replace_contract_alerts(
+            db,
+            contract_id,
+            ((contract_id, row["kpi_type"], row["date"], row["expected_value"], row["actual_value"]) for row in rows),
+        )
+        rebuild_anomaly_state(db, contract_id)
+        written += len(rows)
+
+    db.commit()
+    return written
+
+
+def ensure_kpi_rollup(db: Session) -> None:
+    if db.query(models.KPIDaily.id).first() is not None:
+        if db.query(models.KPIAlertRecord.id).first() is None:
+            backfill_kpi_alerts(db)
+        if db.query(models.KPIAnomalyState.id).first() is None and db.query(models.KPIActual.id).first() is not None:
+            backfill_anomaly_state(db)
+        return
+    if db.query(models.KPIExpected.id).first() is None and db.query(models.KPIActual.id).first() is None:
+        return
+    rebuild_kpi_rollup(db)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the kpi_daily rollup, stored alerts and anomaly state from kpi_expected/kpi_actual."
+    )
+    parser.add_argument("--contract-id", type=int, action="append", dest="contract_ids")
+    args = parser.parse_args()
+
+    upgrade(get_engine())
+    db = SessionLocal()
+    try:
+        written = rebuild_kpi_rollup(db, args.contract_ids)
+    finally:
+        db.close()
+    print(f"kpi_daily rebuilt: {written} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import date
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Type
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
 
-from app import models, schemas
-from app.database import Base, SessionLocal, engine
+from app import async_api, instrumentation, models, schemas
+from app.config import Settings, settings
+from app.contract_import import contract_import_error, import_contract_graphs
+from app.coverage_index import CoverageIndex, coverage_index, record_coverage_changes
+from app.database import SessionLocal, configure_database, get_engine
+from app.decision_cache import cached_coverage_decision, decision_cache, sync_coverage_index
+from app.kpi_alerts import alert_broker, contract_alerts, scan_portfolio_alerts
+from app.kpi_anomalies import contract_anomalies
+from app.kpi_engine import GRANULARITIES, contract_kpi_series, stream_kpi_series
+from app.kpi_export import EXPORT_FORMATS, default_export_format, export_format_available, export_kpi_history
+from app.kpi_ingest import existing_contract_ids, ingest_kpi_values
+from app.kpi_retention import compacted_keys
+from app.kpi_rollup import apply_kpi_value
+from app.migrations import prepare_database
+from app.response_cache import cached_response, load_backend, response_cache
 from app.seed import seed_data
-from app.services import KPI_TYPES, build_kpi_series, decide_coverage
+from app.serialization import dumps
+from app.services import KPI_TYPES, evaluate_coverage
 
-Base.metadata.create_all(bind=engine)
+router = APIRouter()
+sync_read_router = APIRouter()
 
-app = FastAPI(title="Service Contract Management Demo")
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+STREAM_CHUNK_LINES = 500
+SSE_KEEPALIVE_SECONDS = 15
 
 
 def get_db():
@@ -22,16 +45,7 @@ def get_db():
         db.close()
 
 
-@app.on_event("startup")
-def startup_seed() -> None:
-    db = SessionLocal()
-    try:
-        seed_data(db)
-    finally:
-        db.close()
-
-
-@app.post("/contracts", response_model=schemas.ContractResponse)
+@router.post("/contracts", response_model=schemas.ContractResponse)
 def create_contract(payload: schemas.ContractCreate, db: Session = Depends(get_db)):
     client = db.query(models.Client).filter(models.Client.id == payload.client_id).first()
     if client is None:
@@ -39,12 +53,16 @@ def create_contract(payload: schemas.ContractCreate, db: Session = Depends(get_d
 
     contract = models.Contract(**payload.model_dump())
     db.add(contract)
+    db.flush()
+    record_coverage_changes(db, [contract.id])
     db.commit()
     db.refresh(contract)
+    coverage_index.add_contract(contract)
+    decision_cache.invalidate(contract_id=contract.id)
     return contract
 
 
-@app.post("/appendices", response_model=schemas.AppendixResponse)
+@router.post("/appendices", response_model=schemas.AppendixResponse)
 def create_appendix(payload: schemas.AppendixCreate, db: Session = Depends(get_db)):
     contract = db.query(models.Contract).filter(models.Contract.id == payload.contract_id).first()
     if contract is None:
@@ -52,12 +70,15 @@ def create_appendix(payload: schemas.AppendixCreate, db: Session = Depends(get_d
 
     appendix = models.Appendix(**payload.model_dump())
     db.add(appendix)
+    record_coverage_changes(db, [appendix.contract_id])
     db.commit()
     db.refresh(appendix)
+    coverage_index.add_appendix(appendix)
+    decision_cache.invalidate(contract_id=appendix.contract_id)
     return appendix
 
 
-@app.post("/contract-lines", response_model=schemas.ContractLineResponse)
+@router.post("/contract-lines", response_model=schemas.ContractLineResponse)
 def create_contract_line(payload: schemas.ContractLineCreate, db: Session = Depends(get_db)):
     appendix = db.query(models.Appendix).filter(models.Appendix.id == payload.appendix_id).first()
     if appendix is None:
@@ -69,12 +90,15 @@ def create_contract_line(payload: schemas.ContractLineCreate, db: Session = Depe
 
     line = models.ContractLine(**payload.model_dump())
     db.add(line)
+    record_coverage_changes(db, [appendix.contract_id])
     db.commit()
     db.refresh(line)
+    coverage_index.add_line(line)
+    decision_cache.invalidate(contract_id=appendix.contract_id, appendix_id=line.appendix_id, line_id=line.id)
     return line
 
 
-@app.post("/kpi/expected", response_model=schemas.KPIExpectedResponse)
+@router.post("/kpi/expected", response_model=schemas.KPIExpectedResponse)
 def create_kpi_expected(payload: schemas.KPIExpectedCreate, db: Session = Depends(get_db)):
     if payload.kpi_type not in KPI_TYPES:
         raise HTTPException(status_code=400, detail="invalid kpi_type")
@@ -82,15 +106,19 @@ def create_kpi_expected(payload: schemas.KPIExpectedCreate, db: Session = Depend
     contract = db.query(models.Contract).filter(models.Contract.id == payload.contract_id).first()
     if contract is None:
         raise HTTPException(status_code=400, detail="contract_id not found")
+    if compacted_keys(db, [(payload.contract_id, payload.kpi_type, payload.date)]):
+        raise HTTPException(status_code=400, detail="date is in a compacted KPI month")
 
     row = models.KPIExpected(**payload.model_dump())
     db.add(row)
+    apply_kpi_value(db, payload.contract_id, payload.kpi_type, payload.date, "expected", payload.expected_value)
     db.commit()
+    response_cache.invalidate([payload.contract_id])
     db.refresh(row)
     return row
 
 
-@app.post("/kpi/actual", response_model=schemas.KPIActualResponse)
+@router.post("/kpi/actual", response_model=schemas.KPIActualResponse)
 def create_kpi_actual(payload: schemas.KPIActualCreate, db: Session = Depends(get_db)):
     if payload.kpi_type not in KPI_TYPES:
         raise HTTPException(status_code=400, detail="invalid kpi_type")
@@ -98,19 +126,114 @@ def create_kpi_actual(payload: schemas.KPIActualCreate, db: Session = Depends(ge
     contract = db.query(models.Contract).filter(models.Contract.id == payload.contract_id).first()
     if contract is None:
         raise HTTPException(status_code=400, detail="contract_id not found")
+    if compacted_keys(db, [(payload.contract_id, payload.kpi_type, payload.date)]):
+        raise HTTPException(status_code=400, detail="date is in a compacted KPI month")
 
     row = models.KPIActual(**payload.model_dump())
     db.add(row)
+    apply_kpi_value(db, payload.contract_id, payload.kpi_type, payload.date, "actual", payload.actual_value)
     db.commit()
+    response_cache.invalidate([payload.contract_id])
     db.refresh(row)
     return row
 
 
-@app.post("/decisions/coverage", response_model=schemas.DecisionResponse)
-def coverage_decision(payload: schemas.DecisionRequest, db: Session = Depends(get_db)):
+async def read_bulk_rows(request: Request, model: Type[BaseModel]) -> List[BaseModel]:
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if media_type not in NDJSON_MEDIA_TYPES:
+            return TypeAdapter(List[model]).validate_json(await request.body())
+
+        rows = []
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            rows.extend(model.model_validate_json(line) for line in lines if line.strip())
+        if pending.strip():
+            rows.append(model.model_validate_json(pending))
+        return rows
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+
+def bulk_request_body(schema_name: str) -> Dict[str, object]:
+    rows = {"type": "array", "items": {"$ref": f"#/components/schemas/{schema_name}"}}
+    row = {"$ref": f"#/components/schemas/{schema_name}"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": rows}, "application/x-ndjson": {"schema": row}},
+        }
+    }
+
+
+def ingest_kpi_bulk(db: Session, source: str, rows: List[BaseModel]) -> schemas.KPIBulkResult:
+    if any(row.kpi_type not in KPI_TYPES for row in rows):
+        raise HTTPException(status_code=400, detail="invalid kpi_type")
+
+    contract_ids = {row.contract_id for row in rows}
+    if contract_ids - existing_contract_ids(db, contract_ids):
+        raise HTTPException(status_code=400, detail="contract_id not found")
+
+    value_field = f"{source}_value"
+    values = {(row.contract_id, row.kpi_type, row.date): getattr(row, value_field) for row in rows}
+    if compacted_keys(db, values):
+        raise HTTPException(status_code=400, detail="date is in a compacted KPI month")
+    counts = ingest_kpi_values(db, source, values)
+    db.commit()
+    response_cache.invalidate(contract_ids)
+    return schemas.KPIBulkResult(received=len(rows), **counts)
+
+
+@router.post(
+    "/kpi/expected/bulk",
+    response_model=schemas.KPIBulkResult,
+    openapi_extra=bulk_request_body("KPIExpectedCreate"),
+)
+async def create_kpi_expected_bulk(request: Request, db: Session = Depends(get_db)):
+    rows = await read_bulk_rows(request, schemas.KPIExpectedCreate)
+    return await run_in_threadpool(ingest_kpi_bulk, db, "expected", rows)
+
+
+@router.post(
+    "/kpi/actual/bulk",
+    response_model=schemas.KPIBulkResult,
+    openapi_extra=bulk_request_body("KPIActualCreate"),
+)
+async def create_kpi_actual_bulk(request: Request, db: Session = Depends(get_db)):
+    rows = await read_bulk_rows(request, schemas.KPIActualCreate)
+    return await run_in_threadpool(ingest_kpi_bulk, db, "actual", rows)
+
+
+def import_contracts(db: Session, contracts: List[schemas.ContractImport]) -> schemas.ContractImportResult:
+    error = contract_import_error(db, contracts)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
+
+    result, records = import_contract_graphs(db, contracts)
+    db.commit()
+    coverage_index.add_records(*records)
+    for contract_id in result.contract_ids:
+        decision_cache.invalidate(contract_id=contract_id)
+    return result
+
+
+@router.post(
+    "/contracts/import",
+    response_model=schemas.ContractImportResult,
+    openapi_extra=bulk_request_body("ContractImport"),
+)
+async def create_contracts_import(request: Request, db: Session = Depends(get_db)):
+    contracts = await read_bulk_rows(request, schemas.ContractImport)
+    return await run_in_threadpool(import_contracts, db, contracts)
+
+
+@sync_read_router.post("/decisions/coverage", response_model=schemas.DecisionResponse)
+def coverage_decision(payload: schemas.DecisionRequest):
+    sync_coverage_index(coverage_index)
     inputs = payload.inputs.model_dump()
-    decision = decide_coverage(
-        db=db,
+    decision = cached_coverage_decision(
+        coverage_index,
         contract_id=payload.contract_id,
         appendix_id=payload.appendix_id,
         product_id=payload.product_id,
@@ -120,76 +243,330 @@ def coverage_decision(payload: schemas.DecisionRequest, db: Session = Depends(ge
     return decision
 
 
-@app.get("/kpi/contracts/{contract_id}/series", response_model=List[schemas.KPISeries])
-def kpi_series(contract_id: int, db: Session = Depends(get_db)):
+@router.get("/decisions/coverage/cache")
+def coverage_decision_cache_stats() -> Dict[str, object]:
+    return decision_cache.stats()
+
+
+@router.post("/decisions/coverage/batch", response_model=List[schemas.DecisionResponse])
+def coverage_decision_batch(payload: List[schemas.DecisionRequest], db: Session = Depends(get_db)):
+    sync_coverage_index(coverage_index)
+    inputs = [item.inputs.model_dump() for item in payload]
+    keys = [
+        decision_cache.key(item.contract_id, item.appendix_id, item.product_id, item.event_date, item_inputs)
+        for item, item_inputs in zip(payload, inputs)
+    ]
+    decisions = [decision_cache.get(key) for key in keys]
+    misses = [position for position, decision in enumerate(decisions) if decision is None]
+    if not misses:
+        return decisions
+
+    generation = decision_cache.generation
+    pending = [payload[position] for position in misses]
+    index = CoverageIndex.for_requests(
+        db,
+        contract_ids={item.contract_id for item in pending if item.contract_id is not None},
+        appendix_ids={item.appendix_id for item in pending if item.appendix_id is not None},
+        product_ids={item.product_id for item in pending},
+    )
+    for position in misses:
+        item = payload[position]
+        decisions[position] = evaluate_coverage(
+            index,
+            contract_id=item.contract_id,
+            appendix_id=item.appendix_id,
+            product_id=item.product_id,
+            event_date=item.event_date,
+            inputs=inputs[position],
+        )
+        decision_cache.put(keys[position], decisions[position], generation)
+    return decisions
+
+
+def check_series_filters(granularity: str, kpi_types: Optional[List[str]]) -> None:
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="invalid granularity")
+    if kpi_types is not None and not set(kpi_types) <= KPI_TYPES:
+        raise HTTPException(status_code=400, detail="invalid kpi_type")
+
+
+@sync_read_router.get("/kpi/contracts/{contract_id}/series", response_model=List[schemas.KPISeries])
+def kpi_series(
+    request: Request,
+    contract_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    granularity: str = "day",
+    kpi_types: Optional[List[str]] = Query(None, alias="kpi_type"),
+    db: Session = Depends(get_db),
+):
+    check_series_filters(granularity, kpi_types)
+
+    key = response_cache.key("series", contract_id, date_from, date_to, granularity, kpi_types)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_response(request, cached)
+    generation = response_cache.generation(contract_id)
+
     contract = db.query(models.Contract).filter(models.Contract.id == contract_id).first()
     if contract is None:
         raise HTTPException(status_code=404, detail="contract not found")
 
-    results: List[schemas.KPISeries] = []
-    for kpi_type in sorted(KPI_TYPES):
-        expected_rows = (
-            db.query(models.KPIExpected)
-            .filter(
-                models.KPIExpected.contract_id == contract_id,
-                models.KPIExpected.kpi_type == kpi_type,
-            )
-            .all()
-        )
-        actual_rows = (
-            db.query(models.KPIActual)
-            .filter(
-                models.KPIActual.contract_id == contract_id,
-                models.KPIActual.kpi_type == kpi_type,
-            )
-            .all()
-        )
-        series = build_kpi_series(expected_rows, actual_rows)
-        results.append(schemas.KPISeries(kpi_type=kpi_type, series=series))
+    body = dumps(
+        [
+            {"kpi_type": kpi_type, "series": series}
+            for kpi_type, series in contract_kpi_series(db, contract_id, date_from, date_to, granularity, kpi_types)
+        ]
+    )
+    return cached_response(request, response_cache.put(contract_id, key, body, generation))
+
+
+def kpi_series_lines(
+    contract_id: int,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    granularity: str,
+    kpi_types: Optional[List[str]],
+) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        lines = []
+        for kpi_type, point in stream_kpi_series(db, contract_id, date_from, date_to, granularity, kpi_types):
+            lines.append(dumps({"kpi_type": kpi_type, **point}))
+            if len(lines) == STREAM_CHUNK_LINES:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        db.close()
+
+
+@router.get(
+    "/kpi/contracts/{contract_id}/series/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+def kpi_series_stream(
+    contract_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    granularity: str = "day",
+    kpi_types: Optional[List[str]] = Query(None, alias="kpi_type"),
+    db: Session = Depends(get_db),
+):
+    check_series_filters(granularity, kpi_types)
+
+    contract = db.query(models.Contract.id).filter(models.Contract.id == contract_id).first()
+    if contract is None:
+        raise HTTPException(status_code=404, detail="contract not found")
+
+    return StreamingResponse(
+        kpi_series_lines(contract_id, date_from, date_to, granularity, kpi_types),
+        media_type="application/x-ndjson",
+    )
+
+
+def kpi_export_body(
+    export_format: str,
+    contract_ids: Optional[List[int]],
+    client_id: Optional[int],
+    date_from: Optional[date],
+    date_to: Optional[date],
+) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        yield from export_kpi_history(db, export_format, contract_ids, client_id, date_from, date_to)
+    finally:
+        db.close()
+
+
+@router.get(
+    "/kpi/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type, _ in EXPORT_FORMATS.values()}}},
+)
+def kpi_export(
+    export_format: Optional[str] = Query(None, alias="format"),
+    contract_ids: Optional[List[int]] = Query(None, alias="contract_id"),
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    export_format = export_format or default_export_format()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="invalid format")
+    if not export_format_available(export_format):
+        raise HTTPException(status_code=400, detail="format requires pyarrow")
+    if client_id is not None:
+        client = db.query(models.Client.id).filter(models.Client.id == client_id).first()
+        if client is None:
+            raise HTTPException(status_code=404, detail="client not found")
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        kpi_export_body(export_format, contract_ids, client_id, date_from, date_to),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="kpi_export.{extension}"'},
+    )
 
-    return results
 
+@sync_read_router.get("/kpi/contracts/{contract_id}/alerts", response_model=List[schemas.KPIAlert])
+def kpi_alerts(request: Request, contract_id: int, db: Session = Depends(get_db)):
+    key = response_cache.key("alerts", contract_id)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_response(request, cached)
+    generation = response_cache.generation(contract_id)
 
-@app.get("/kpi/contracts/{contract_id}/alerts", response_model=List[schemas.KPIAlert])
-def kpi_alerts(contract_id: int, db: Session = Depends(get_db)):
     contract = db.query(models.Contract).filter(models.Contract.id == contract_id).first()
     if contract is None:
         raise HTTPException(status_code=404, detail="contract not found")
 
-    alerts: List[schemas.KPIAlert] = []
-    for kpi_type in sorted(KPI_TYPES):
-        expected_rows = (
-            db.query(models.KPIExpected)
-            .filter(
-                models.KPIExpected.contract_id == contract_id,
-                models.KPIExpected.kpi_type == kpi_type,
-            )
-            .all()
-        )
-        actual_rows = (
-            db.query(models.KPIActual)
-            .filter(
-                models.KPIActual.contract_id == contract_id,
-                models.KPIActual.kpi_type == kpi_type,
-            )
-            .all()
-        )
-        series = build_kpi_series(expected_rows, actual_rows)
-        for point in series:
-            if point["alert_level"] != "GREEN" or point["spike"]:
-                alerts.append(
-                    schemas.KPIAlert(
-                        kpi_type=kpi_type,
-                        date=point["date"],
-                        alert_level=point["alert_level"],
-                        delta_percent=point["delta_percent"],
-                        spike=point["spike"],
-                    )
-                )
-
-    return alerts
-
-
-@app.get("/health")
+    body = dumps(contract_alerts(db, contract_id))
+    return cached_response(request, response_cache.put(contract_id, key, body, generation))
+
+
+@router.get("/kpi/contracts/{contract_id}/anomalies", response_model=List[schemas.KPIAnomaly])
+def kpi_anomalies(contract_id: int, db: Session = Depends(get_db)):
+    contract = db.query(models.Contract.id).filter(models.Contract.id == contract_id).first()
+    if contract is None:
+        raise HTTPException(status_code=404, detail="contract not found")
+    return contract_anomalies(db, contract_id)
+
+
+def accepts_ndjson(request: Request) -> bool:
+    return any(
+        media_type.split(";")[0].strip() in NDJSON_MEDIA_TYPES
+        for media_type in request.headers.get("accept", "").split(",")
+    )
+
+
+def portfolio_alert_chunks(
+    client_id: Optional[int], date_from: Optional[date], date_to: Optional[date]
+) -> Iterator[List[bytes]]:
+    db = SessionLocal()
+    try:
+        lines = []
+        for alert in scan_portfolio_alerts(db, client_id, date_from, date_to):
+            lines.append(dumps(alert))
+            if len(lines) == STREAM_CHUNK_LINES:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+    finally:
+        db.close()
+
+
+def portfolio_alert_lines(chunks: Iterator[List[bytes]]) -> Iterator[bytes]:
+    for lines in chunks:
+        yield b"\n".join(lines) + b"\n"
+
+
+def portfolio_alert_array(chunks: Iterator[List[bytes]]) -> Iterator[bytes]:
+    prefix = b"["
+    for lines in chunks:
+        yield prefix + b",".join(lines)
+        prefix = b","
+    yield b"[]" if prefix == b"[" else b"]"
+
+
+@router.get(
+    "/kpi/alerts",
+    response_model=List[schemas.PortfolioAlert],
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+def kpi_portfolio_alerts(
+    request: Request,
+    client_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    if client_id is not None:
+        client = db.query(models.Client.id).filter(models.Client.id == client_id).first()
+        if client is None:
+            raise HTTPException(status_code=404, detail="client not found")
+
+    chunks = portfolio_alert_chunks(client_id, date_from, date_to)
+    if accepts_ndjson(request):
+        return StreamingResponse(portfolio_alert_lines(chunks), media_type="application/x-ndjson")
+    return StreamingResponse(portfolio_alert_array(chunks), media_type="application/json")
+
+
+async def alert_events(request: Request, contract_id: Optional[int]):
+    queue = alert_broker.subscribe()
+    try:
+        while not await request.is_disconnected():
+            try:
+                alert = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if contract_id is None or alert["contract_id"] == contract_id:
+                yield b"event: alert\ndata: " + dumps(alert) + b"\n\n"
+    finally:
+        alert_broker.unsubscribe(queue)
+
+
+@router.get(
+    "/kpi/alerts/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def kpi_alert_stream(request: Request, contract_id: Optional[int] = None):
+    return StreamingResponse(
+        alert_events(request, contract_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/health")
 def healthcheck() -> Dict[str, str]:
     return {"status": "ok", "date": date.today().isoformat()}
+
+
+def startup(config: Settings) -> None:
+    bind = get_engine()
+    if config.create_schema:
+        prepare_database(bind, seed=config.seed_demo_data)
+    db = SessionLocal()
+    try:
+        if config.seed_demo_data and not config.create_schema:
+            seed_data(db)
+        coverage_index.load(db)
+        decision_cache.clear()
+    finally:
+        db.close()
+
+
+def create_app(config: Settings = settings) -> FastAPI:
+    configure_database(config)
+    response_cache.backend = load_backend(config)
+    response_cache.ttl_seconds = config.response_cache_ttl_seconds
+    decision_cache.max_entries = config.decision_cache_max_entries
+    coverage_index.refresh_seconds = config.coverage_refresh_seconds
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await run_in_threadpool(startup, config)
+        if config.instrumentation:
+            instrumentation.start()
+        try:
+            yield
+        finally:
+            if config.instrumentation:
+                instrumentation.stop()
+
+    app = FastAPI(title="Service Contract Management Demo", lifespan=lifespan)
+    app.include_router(router)
+    app.include_router(async_api.router if config.async_endpoints else sync_read_router)
+    if config.instrumentation:
+        instrumentation.install(app)
+    return app
+
+
+app = create_app()
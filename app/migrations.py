@@ -0,0 +1,50 @@
+import argparse
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.database import SessionLocal, get_engine
+from app.models import Base
+from app.seed import seed_data
+
+
+def upgrade(bind: Engine) -> List[str]:
+    Base.metadata.create_all(bind=bind)
+
+    inspector = inspect(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda item: item.name):
+            if index.name not in existing:
+                index.create(bind=bind)
+                created.append(index.name)
+    return created
+
+
+def prepare_database(bind: Engine, seed: bool = False) -> List[str]:
+    from app.kpi_rollup import ensure_kpi_rollup
+
+    created = upgrade(bind)
+    db = SessionLocal(bind=bind)
+    try:
+        if seed:
+            seed_data(db)
+        ensure_kpi_rollup(db)
+    finally:
+        db.close()
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create missing tables and indexes and backfill KPI rollups.")
+    parser.add_argument("--seed", action="store_true", help="also load the demo data into an empty database")
+    args = parser.parse_args()
+
+    created = prepare_database(get_engine(), seed=args.seed)
+    print(f"created indexes: {', '.join(created) if created else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
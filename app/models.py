@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, Float, String, Date, ForeignKey, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -44,7 +44,7 @@ class Appendix(Base):
     __tablename__ = "appendices"
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
@@ -84,6 +84,10 @@ class KPIExpected(Base):
     date = Column(Date, nullable=False)
     expected_value = Column(Integer, nullable=False)
 
+    __table_args__ = (
+        Index("ix_kpi_expected_contract_type_date", "contract_id", "kpi_type", "date", "expected_value"),
+    )
+
 
 class KPIActual(Base):
     __tablename__ = "kpi_actual"
@@ -93,3 +97,87 @@ class KPIActual(Base):
     kpi_type = Column(String, nullable=False)
     date = Column(Date, nullable=False)
     actual_value = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_kpi_actual_contract_type_date", "contract_id", "kpi_type", "date", "actual_value"),
+    )
+
+
+class KPIDaily(Base):
+    __tablename__ = "kpi_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    kpi_type = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    expected_value = Column(Integer, nullable=False, default=0)
+    actual_value = Column(Integer, nullable=False, default=0)
+    expected_cumulative = Column(Integer, nullable=False, default=0)
+    actual_cumulative = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint("contract_id", "kpi_type", "date", name="uq_kpi_daily_day"),)
+
+
+class KPIMonthly(Base):
+    __tablename__ = "kpi_monthly"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    kpi_type = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    expected_value = Column(Integer, nullable=False, default=0)
+    actual_value = Column(Integer, nullable=False, default=0)
+    expected_cumulative = Column(Integer, nullable=False, default=0)
+    actual_cumulative = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint("contract_id", "kpi_type", "date", name="uq_kpi_monthly_month"),)
+
+
+class KPIAlertRecord(Base):
+    __tablename__ = "kpi_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    kpi_type = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    alert_level = Column(String, nullable=False)
+    delta_percent = Column(Float, nullable=False)
+    spike = Column(Boolean, nullable=False)
+
+    __table_args__ = (UniqueConstraint("contract_id", "kpi_type", "date", name="uq_kpi_alert_day"),)
+
+
+class KPIAnomalyState(Base):
+    __tablename__ = "kpi_anomaly_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    kpi_type = Column(String, nullable=False)
+    last_date = Column(Date, nullable=False)
+    count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    variance = Column(Float, nullable=False)
+
+    __table_args__ = (UniqueConstraint("contract_id", "kpi_type", name="uq_kpi_anomaly_state_stream"),)
+
+
+class KPIAnomaly(Base):
+    __tablename__ = "kpi_anomalies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    kpi_type = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    actual_value = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    std = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=False)
+
+    __table_args__ = (UniqueConstraint("contract_id", "kpi_type", "date", name="uq_kpi_anomaly_day"),)
+
+
+class CoverageChange(Base):
+    __tablename__ = "coverage_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
@@ -0,0 +1,122 @@
+import hashlib
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Protocol, Set, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import Settings, settings
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[CachedResponse]: ...
+
+    def set(self, contract_id: int, key: str, value: CachedResponse, ttl_seconds: float) -> None: ...
+
+    def invalidate(self, contract_id: int) -> None: ...
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, int, CachedResponse]]" = OrderedDict()
+        self._by_contract: Dict[int, Set[str]] = {}
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, contract_id, value = entry
+            if expires_at < time.monotonic():
+                self._drop(key, contract_id)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, contract_id: int, key: str, value: CachedResponse, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, contract_id, value)
+            self._entries.move_to_end(key)
+            self._by_contract.setdefault(contract_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest, (_, oldest_contract_id, _) = next(iter(self._entries.items()))
+                self._drop(oldest, oldest_contract_id)
+
+    def invalidate(self, contract_id: int) -> None:
+        with self._lock:
+            for key in self._by_contract.pop(contract_id, ()):
+                self._entries.pop(key, None)
+
+    def _drop(self, key: str, contract_id: int) -> None:
+        self._entries.pop(key, None)
+        keys = self._by_contract.get(contract_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_contract[contract_id]
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend], ttl_seconds: float) -> None:
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._generations: Dict[int, int] = {}
+
+    @staticmethod
+    def key(namespace: str, contract_id: int, *params: object) -> str:
+        params = tuple(tuple(sorted(set(value))) if isinstance(value, list) else value for value in params)
+        return f"{namespace}:{contract_id}:{params!r}"
+
+    def generation(self, contract_id: int) -> int:
+        return self._generations.get(contract_id, 0)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        if self.backend is None:
+            return None
+        return self.backend.get(key)
+
+    def put(self, contract_id: int, key: str, body: bytes, generation: int) -> CachedResponse:
+        value = CachedResponse(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        if self.backend is not None and self.generation(contract_id) == generation:
+            self.backend.set(contract_id, key, value, self.ttl_seconds)
+        return value
+
+    def invalidate(self, contract_ids: Iterable[int]) -> None:
+        for contract_id in contract_ids:
+            with self._lock:
+                self._generations[contract_id] = self._generations.get(contract_id, 0) + 1
+            if self.backend is not None:
+                self.backend.invalidate(contract_id)
+
+
+def cached_response(request: Request, value: CachedResponse) -> Response:
+    headers = {"ETag": value.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or value.etag in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(value.body, media_type="application/json", headers=headers)
+
+
+def load_backend(config: Settings = settings) -> Optional[CacheBackend]:
+    if not config.response_cache:
+        return None
+    if config.response_cache_backend:
+        module_name, _, attr = config.response_cache_backend.partition(":")
+        return getattr(importlib.import_module(module_name), attr)()
+    return MemoryBackend(config.response_cache_max_entries)
+
+
+response_cache = ResponseCache(load_backend(), settings.response_cache_ttl_seconds)
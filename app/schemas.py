@@ -70,6 +70,37 @@ class ContractLineResponse(ContractLineBase):
         from_attributes = True
 
 
+class ContractLineImport(BaseModel):
+    product_id: int
+    start_date: date
+    end_date: date
+    status: str
+    warranty_start_rule: str
+    warranty_duration_months: int
+    warranty_options: List[str]
+    out_of_warranty_options: List[str]
+    required_inputs: List[str]
+
+
+class AppendixImport(BaseModel):
+    name: str
+    start_date: date
+    end_date: date
+    status: str
+    lines: List[ContractLineImport] = Field(default_factory=list)
+
+
+class ContractImport(ContractBase):
+    appendices: List[AppendixImport] = Field(default_factory=list)
+
+
+class ContractImportResult(BaseModel):
+    contracts: int
+    appendices: int
+    lines: int
+    contract_ids: List[int]
+
+
 class KPIExpectedBase(BaseModel):
     contract_id: int
     kpi_type: str
@@ -106,6 +137,12 @@ class KPIActualResponse(KPIActualBase):
         from_attributes = True
 
 
+class KPIBulkResult(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+
+
 class DecisionInputs(BaseModel):
     serial_number: Optional[str] = None
     purchase_date: Optional[date] = None
@@ -158,3 +195,16 @@ class KPIAlert(BaseModel):
     alert_level: str
     delta_percent: float
     spike: bool
+
+
+class PortfolioAlert(KPIAlert):
+    contract_id: int
+
+
+class KPIAnomaly(BaseModel):
+    kpi_type: str
+    date: date
+    actual_value: int
+    mean: float
+    std: float
+    z_score: float
@@ -0,0 +1,12 @@
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: object) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return to_json(content)
@@ -1,10 +1,17 @@
 from datetime import date
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from dateutil.relativedelta import relativedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, joinedload
 
 from app import models
+from app.instrumentation import instrumented
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 KPI_TYPES = {
     "repairs",
@@ -15,11 +22,19 @@ KPI_TYPES = {
     "parts_sales",
 }
 
+ALERT_LEVELS = ("GREEN", "ORANGE", "RED")
+
+VECTORIZED_MIN_POINTS = 256
+
+WARRANTY_START_INPUTS = frozenset({"purchase_date", "activation_date", "manufacture_date"})
 
+
+@lru_cache(maxsize=32768)
 def add_months(start_date: date, months: int) -> date:
     return start_date + relativedelta(months=months)
 
 
+@instrumented
 def resolve_contract_context(
     db: Session, contract_id: Optional[int], appendix_id: Optional[int]
 ) -> Tuple[Optional[models.Contract], Optional[models.Appendix], List[str]]:
@@ -28,7 +43,12 @@ def resolve_contract_context(
     appendix = None
 
     if appendix_id is not None:
-        appendix = db.query(models.Appendix).filter(models.Appendix.id == appendix_id).first()
+        appendix = (
+            db.query(models.Appendix)
+            .options(joinedload(models.Appendix.contract))
+            .filter(models.Appendix.id == appendix_id)
+            .first()
+        )
         if appendix is None:
             reasons.append("appendix_not_found")
             return None, None, reasons
@@ -44,6 +64,7 @@ def resolve_contract_context(
     return contract, appendix, reasons
 
 
+@instrumented
 def select_line(
     db: Session,
     contract: models.Contract,
@@ -51,31 +72,48 @@ def select_line(
     product_id: int,
     event_date: date,
 ) -> Tuple[Optional[models.Appendix], Optional[models.ContractLine], List[str]]:
+    query = (
+        db.query(models.ContractLine)
+        .join(models.ContractLine.appendix)
+        .options(contains_eager(models.ContractLine.appendix))
+        .filter(
+            models.ContractLine.product_id == product_id,
+            models.ContractLine.status == "active",
+            models.ContractLine.start_date <= event_date,
+            models.ContractLine.end_date >= event_date,
+            models.Appendix.status == "active",
+            models.Appendix.start_date <= event_date,
+            models.Appendix.end_date >= event_date,
+        )
+    )
+    if appendix is not None:
+        query = query.filter(models.Appendix.id == appendix.id)
+    else:
+        query = query.filter(models.Appendix.contract_id == contract.id)
+
+    candidates = [(line.appendix, line) for line in query.order_by(models.Appendix.id, models.ContractLine.id)]
+    return match_line(contract, appendix, candidates, event_date)
+
+
+def match_line(
+    contract,
+    appendix,
+    candidates: Iterable[Tuple[object, object]],
+    event_date: date,
+) -> Tuple[Optional[object], Optional[object], List[str]]:
     reasons: List[str] = []
-    appendices = [appendix] if appendix is not None else contract.appendices
-
-    active_appendices = [
-        item
-        for item in appendices
-        if item is not None
-        and item.status == "active"
-        and item.start_date <= event_date <= item.end_date
-    ]
 
-    for app in active_appendices:
-        for line in app.lines:
-            if (
-                line.product_id == product_id
-                and line.status == "active"
-                and line.start_date <= event_date <= line.end_date
-            ):
-                if not (contract.start_date <= app.start_date <= line.start_date):
-                    reasons.append("date_hierarchy_invalid")
-                    continue
-                if not (line.end_date <= app.end_date <= contract.end_date):
-                    reasons.append("date_hierarchy_invalid")
-                    continue
-                return app, line, reasons
+    for app, line in candidates:
+        if app.status != "active" or not (app.start_date <= event_date <= app.end_date):
+            continue
+        if line.status == "active" and line.start_date <= event_date <= line.end_date:
+            if not (contract.start_date <= app.start_date <= line.start_date):
+                reasons.append("date_hierarchy_invalid")
+                continue
+            if not (line.end_date <= app.end_date <= contract.end_date):
+                reasons.append("date_hierarchy_invalid")
+                continue
+            return app, line, reasons
 
     reasons.append("no_active_line_for_product")
     return appendix, None, reasons
@@ -118,6 +156,18 @@ def warranty_start_date(
     return value, missing
 
 
+class SessionLookup:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def resolve(self, contract_id: Optional[int], appendix_id: Optional[int]):
+        return resolve_contract_context(self.db, contract_id, appendix_id)
+
+    def select(self, contract, appendix, product_id: int, event_date: date):
+        return select_line(self.db, contract, appendix, product_id, event_date)
+
+
+@instrumented
 def decide_coverage(
     db: Session,
     contract_id: Optional[int],
@@ -125,11 +175,23 @@ def decide_coverage(
     product_id: int,
     event_date: date,
     inputs: Dict[str, Optional[object]],
+) -> Dict[str, object]:
+    return evaluate_coverage(SessionLookup(db), contract_id, appendix_id, product_id, event_date, inputs)
+
+
+@instrumented
+def evaluate_coverage(
+    lookup,
+    contract_id: Optional[int],
+    appendix_id: Optional[int],
+    product_id: int,
+    event_date: date,
+    inputs: Dict[str, Optional[object]],
 ) -> Dict[str, object]:
     reasons: List[str] = []
     required_inputs: List[str] = []
 
-    contract, appendix, reasons = resolve_contract_context(db, contract_id, appendix_id)
+    contract, appendix, reasons = lookup.resolve(contract_id, appendix_id)
     if contract is None:
         return {
             "eligible": False,
@@ -157,7 +219,7 @@ def decide_coverage(
             "warranty_end_date": None,
         }
 
-    resolved_appendix, line, line_reasons = select_line(db, contract, appendix, product_id, event_date)
+    resolved_appendix, line, line_reasons = lookup.select(contract, appendix, product_id, event_date)
     reasons.extend(line_reasons)
 
     if line is None:
@@ -193,7 +255,7 @@ def decide_coverage(
     warranty_end = add_months(start_date, line.warranty_duration_months)
     in_warranty = event_date <= warranty_end
 
-    options = line.warranty_options if in_warranty else line.out_of_warranty_options
+    options = list(line.warranty_options if in_warranty else line.out_of_warranty_options)
 
     return {
         "eligible": True,
@@ -208,6 +270,7 @@ def decide_coverage(
     }
 
 
+@instrumented
 def build_kpi_series(
     expected_rows: List[models.KPIExpected], actual_rows: List[models.KPIActual]
 ) -> List[Dict[str, object]]:
@@ -215,41 +278,121 @@ def build_kpi_series(
     actual_map = {row.date: row.actual_value for row in actual_rows}
     all_dates = sorted(set(expected_map.keys()) | set(actual_map.keys()))
 
-    series = []
-    expected_cumulative = 0
-    actual_cumulative = 0
+    return build_kpi_series_columns(
+        all_dates,
+        [expected_map.get(day, 0) for day in all_dates],
+        [actual_map.get(day, 0) for day in all_dates],
+    )
+
+
+@instrumented
+def build_kpi_series_columns(
+    dates: List[date],
+    expected_values: List[int],
+    actual_values: List[int],
+    expected_offset: int = 0,
+    actual_offset: int = 0,
+) -> List[Dict[str, object]]:
+    if np is not None and len(dates) >= VECTORIZED_MIN_POINTS:
+        return build_kpi_series_vectorized(dates, expected_values, actual_values, expected_offset, actual_offset)
+    return build_kpi_series_loop(dates, expected_values, actual_values, expected_offset, actual_offset)
+
 
-    for day in all_dates:
-        expected_value = expected_map.get(day, 0)
-        actual_value = actual_map.get(day, 0)
+def build_kpi_series_loop(
+    dates: List[date],
+    expected_values: List[int],
+    actual_values: List[int],
+    expected_offset: int = 0,
+    actual_offset: int = 0,
+) -> List[Dict[str, object]]:
+    return list(iter_kpi_series(zip(dates, expected_values, actual_values), expected_offset, actual_offset))
+
+
+def iter_kpi_series(
+    points: Iterable[Tuple[date, int, int]],
+    expected_offset: int = 0,
+    actual_offset: int = 0,
+) -> Iterator[Dict[str, object]]:
+    expected_cumulative = expected_offset
+    actual_cumulative = actual_offset
+
+    for day, expected_value, actual_value in points:
         expected_cumulative += expected_value
         actual_cumulative += actual_value
+        delta_percent, alert_level, spike = kpi_alert(expected_value, actual_value)
+
+        yield {
+            "date": day,
+            "expected": expected_value,
+            "actual": actual_value,
+            "expected_cumulative": expected_cumulative,
+            "actual_cumulative": actual_cumulative,
+            "delta_percent": delta_percent,
+            "alert_level": alert_level,
+            "spike": spike,
+        }
 
-        if expected_value == 0:
-            delta_percent = 0.0 if actual_value == 0 else 100.0
-        else:
-            delta_percent = ((actual_value - expected_value) / expected_value) * 100
-
-        if abs(delta_percent) <= 5:
-            alert_level = "GREEN"
-        elif abs(delta_percent) <= 10:
-            alert_level = "ORANGE"
-        else:
-            alert_level = "RED"
-
-        spike = expected_value > 0 and actual_value > expected_value * 1.5
-
-        series.append(
-            {
-                "date": day,
-                "expected": expected_value,
-                "actual": actual_value,
-                "expected_cumulative": expected_cumulative,
-                "actual_cumulative": actual_cumulative,
-                "delta_percent": round(delta_percent, 2),
-                "alert_level": alert_level,
-                "spike": spike,
-            }
-        )
 
-    return series
+def kpi_alert(expected_value: int, actual_value: int) -> Tuple[float, str, bool]:
+    if expected_value == 0:
+        delta_percent = 0.0 if actual_value == 0 else 100.0
+    else:
+        delta_percent = ((actual_value - expected_value) / expected_value) * 100
+
+    if abs(delta_percent) <= 5:
+        alert_level = "GREEN"
+    elif abs(delta_percent) <= 10:
+        alert_level = "ORANGE"
+    else:
+        alert_level = "RED"
+
+    spike = expected_value > 0 and actual_value > expected_value * 1.5
+    return round(delta_percent, 2), alert_level, spike
+
+
+def build_kpi_series_vectorized(
+    dates: List[date],
+    expected_values: List[int],
+    actual_values: List[int],
+    expected_offset: int = 0,
+    actual_offset: int = 0,
+) -> List[Dict[str, object]]:
+    expected = np.asarray(expected_values, dtype=np.int64)
+    actual = np.asarray(actual_values, dtype=np.int64)
+
+    no_expected = expected == 0
+    delta = np.where(
+        no_expected,
+        np.where(actual == 0, 0.0, 100.0),
+        (actual - expected) / np.where(no_expected, 1, expected) * 100,
+    )
+    magnitude = np.abs(delta)
+    levels = (magnitude > 5).astype(np.int8) + (magnitude > 10)
+    spikes = (expected > 0) & (actual > expected * 1.5)
+
+    unique_deltas, delta_index = np.unique(delta, return_inverse=True)
+    rounded = np.array([round(value, 2) for value in unique_deltas.tolist()])[delta_index]
+
+    points = zip(
+        dates,
+        expected.tolist(),
+        actual.tolist(),
+        (np.cumsum(expected) + expected_offset).tolist(),
+        (np.cumsum(actual) + actual_offset).tolist(),
+        rounded.tolist(),
+        levels.tolist(),
+        spikes.tolist(),
+    )
+    return [
+        {
+            "date": day,
+            "expected": expected_value,
+            "actual": actual_value,
+            "expected_cumulative": expected_total,
+            "actual_cumulative": actual_total,
+            "delta_percent": delta_percent,
+            "alert_level": ALERT_LEVELS[level],
+            "spike": spike,
+        }
+        for day, expected_value, actual_value, expected_total, actual_total, delta_percent, level, spike in points
+    ]
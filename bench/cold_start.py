@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Dict
+
+
+def worker() -> None:
+    from fastapi.testclient import TestClient
+
+    started = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter()
+    with TestClient(app) as client:
+        ready = time.perf_counter()
+        response = client.post(
+            "/decisions/coverage",
+            json={"contract_id": 1, "product_id": 1, "event_date": date.today().isoformat(), "inputs": {}},
+        )
+        response.raise_for_status()
+        answered = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - started) * 1000,
+                "startup_ms": (ready - imported) * 1000,
+                "first_request_ms": (answered - ready) * 1000,
+                "total_ms": (answered - started) * 1000,
+            }
+        )
+    )
+
+
+def run_worker(env: Dict[str, str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "bench.cold_start", "--worker"], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    timings = json.loads(output.splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def prepare_database(directory: str) -> Dict[str, str]:
+    env = {**os.environ, "APP_DATABASE_URL": f"sqlite:///{os.path.join(directory, 'cold.db')}"}
+    for name in ("APP_CREATE_SCHEMA", "APP_SEED_DEMO_DATA"):
+        env.pop(name, None)
+    subprocess.run([sys.executable, "-m", "app.migrations", "--seed"], env=env, check=True, capture_output=True)
+    return env
+
+
+def median_timings(env: Dict[str, str], runs: int) -> Dict[str, float]:
+    samples = [run_worker(env) for _ in range(runs)]
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure import-to-first-request time of a fresh worker process.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="exit with status 1 if the median total_ms exceeds this")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker()
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        results = median_timings(prepare_database(directory), args.runs)
+    results["runs"] = args.runs
+    print(json.dumps(results, indent=2))
+
+    if args.budget_ms is not None and results["total_ms"] > args.budget_ms:
+        print(f"median total_ms {results['total_ms']} exceeds budget {args.budget_ms}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.coverage_index import CoverageIndex
+from app.database import Base
+from app.seed import seed_data
+from app.services import add_months, decide_coverage, evaluate_coverage
+
+
+def decision_requests(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    today = date.today()
+    requests = []
+    for _ in range(count):
+        purchase = today - timedelta(days=rng.randint(0, 900))
+        requests.append(
+            (
+                1,
+                None,
+                rng.choice([1, 2]),
+                today,
+                {
+                    "serial_number": "SN",
+                    "purchase_date": purchase,
+                    "activation_date": purchase,
+                    "manufacture_date": None,
+                    "proof_provided": True,
+                    "country": None,
+                    "channel": None,
+                },
+            )
+        )
+    return requests
+
+
+def timed(fn, requests) -> float:
+    started = time.perf_counter()
+    for request in requests:
+        fn(*request)
+    return time.perf_counter() - started
+
+
+def main(count: int = 20000) -> None:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed_data(db)
+
+    index = CoverageIndex()
+    index.load(db)
+    requests = decision_requests(count)
+
+    uncached_add_months = add_months.__wrapped__
+    pairs = [(request[4]["purchase_date"], 18) for request in requests]
+
+    results = {
+        "decisions": count,
+        "orm_decisions_per_sec": count / timed(lambda *args: decide_coverage(db, *args), requests),
+        "compiled_decisions_per_sec": count / timed(lambda *args: evaluate_coverage(index, *args), requests),
+        "add_months_uncached_per_sec": count / timed(uncached_add_months, pairs),
+        "add_months_cached_per_sec": count / timed(add_months, pairs),
+    }
+    print(json.dumps({key: round(value) for key, value in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+SCALES = {
+    "small": {"clients": 5, "contracts_per_client": 10, "history_days": (90, 365, 730), "kpi_contracts": 3},
+    "medium": {"clients": 20, "contracts_per_client": 25, "history_days": (365, 730, 1825), "kpi_contracts": 6},
+    "large": {"clients": 100, "contracts_per_client": 100, "history_days": (365, 1825, 3650), "kpi_contracts": 12},
+}
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+    }
+
+
+def measure(fn: Callable[[], object], runs: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return latency_stats(samples)
+
+
+def decision_payloads(summary: Dict[str, object], count: int, seed: int) -> List[Dict[str, object]]:
+    rng = random.Random(seed)
+    anchor = summary["anchor_date"]
+    payloads = []
+    for _ in range(count):
+        purchase = anchor - timedelta(days=rng.randint(0, 1000))
+        payloads.append(
+            {
+                "contract_id": rng.choice(summary["contract_ids"]),
+                "appendix_id": None,
+                "product_id": rng.choice(summary["product_ids"]),
+                "event_date": anchor - timedelta(days=rng.randint(0, 300)),
+                "inputs": {
+                    "serial_number": "SN",
+                    "purchase_date": purchase,
+                    "activation_date": purchase,
+                    "manufacture_date": purchase,
+                    "proof_provided": True,
+                    "country": None,
+                    "channel": None,
+                },
+            }
+        )
+    return payloads
+
+
+def as_json(payload: Dict[str, object]) -> Dict[str, object]:
+    return json.loads(json.dumps(payload, default=str))
+
+
+def bench_decisions(db, client, summary, args) -> Dict[str, object]:
+    from app.coverage_index import coverage_index
+    from app.services import decide_coverage, evaluate_coverage
+
+    payloads = decision_payloads(summary, args.decisions, args.seed)
+    orm_sample = payloads[: max(1, args.decisions // 20)]
+
+    def run_service(lookup_call, items):
+        started = time.perf_counter()
+        for item in items:
+            lookup_call(
+                item["contract_id"], item["appendix_id"], item["product_id"], item["event_date"], item["inputs"]
+            )
+        return len(items) / (time.perf_counter() - started)
+
+    results = {
+        "service_orm_per_sec": round(run_service(lambda *a: decide_coverage(db, *a), orm_sample)),
+        "service_index_per_sec": round(run_service(lambda *a: evaluate_coverage(coverage_index, *a), payloads)),
+    }
+
+    if client is not None:
+        bodies = [as_json(item) for item in payloads]
+        http_sample = bodies[: max(1, args.decisions // 10)]
+        started = time.perf_counter()
+        for body in http_sample:
+            client.post("/decisions/coverage", json=body)
+        results["http_single_per_sec"] = round(len(http_sample) / (time.perf_counter() - started))
+
+        started = time.perf_counter()
+        client.post("/decisions/coverage/batch", json=bodies)
+        results["http_batch_per_sec"] = round(len(bodies) / (time.perf_counter() - started))
+
+    return results
+
+
+def bench_series(db, client, summary, args) -> Dict[str, object]:
+    from app.kpi_engine import contract_kpi_series
+
+    results = {}
+    for days, contract_ids in summary["kpi_contracts_by_history_days"].items():
+        contract_id = contract_ids[0]
+        entry = {
+            "contract_id": contract_id,
+            "service": measure(lambda: contract_kpi_series(db, contract_id), args.runs),
+        }
+        if client is not None:
+            entry["http_series"] = measure(lambda: client.get(f"/kpi/contracts/{contract_id}/series"), args.runs)
+            entry["http_alerts"] = measure(lambda: client.get(f"/kpi/contracts/{contract_id}/alerts"), args.runs)
+        results[days] = entry
+    return results
+
+
+def bench_ingest(db, client, summary, args) -> Dict[str, object]:
+    from app.kpi_ingest import ingest_kpi_values
+    from app.services import KPI_TYPES
+
+    rng = random.Random(args.seed)
+    contract_ids = summary["contract_ids"]
+    kpi_types = sorted(KPI_TYPES)
+    first_day = summary["anchor_date"] + timedelta(days=1)
+
+    def rows(day_offset: int) -> Dict[tuple, int]:
+        values = {}
+        day = 0
+        while len(values) < args.ingest_rows:
+            for contract_id in contract_ids:
+                for kpi_type in kpi_types:
+                    values[(contract_id, kpi_type, first_day + timedelta(days=day_offset + day))] = rng.randint(0, 20)
+            day += 1
+        return dict(list(values.items())[: args.ingest_rows])
+
+    values = rows(0)
+    started = time.perf_counter()
+    ingest_kpi_values(db, "actual", values)
+    db.commit()
+    results = {"rows": len(values), "service_rows_per_sec": round(len(values) / (time.perf_counter() - started))}
+
+    if client is not None:
+        body = [
+            {"contract_id": contract_id, "kpi_type": kpi_type, "date": day.isoformat(), "actual_value": value}
+            for (contract_id, kpi_type, day), value in rows(1000).items()
+        ]
+        started = time.perf_counter()
+        client.post("/kpi/actual/bulk", json=body)
+        results["http_rows_per_sec"] = round(len(body) / (time.perf_counter() - started))
+
+    return results
+
+
+SUITES = {"decisions": bench_decisions, "series": bench_series, "ingest": bench_ingest}
+
+
+def run_suites(args, database: str) -> Dict[str, object]:
+    os.environ["APP_DATABASE_URL"] = f"sqlite:///{database}"
+    if not args.caches:
+        os.environ["APP_RESPONSE_CACHE"] = "false"
+        os.environ["APP_DECISION_CACHE_MAX_ENTRIES"] = "0"
+
+    from bench.synthetic import ANCHOR_DATE, generate
+    from app.database import SessionLocal, get_engine
+    from app.migrations import upgrade
+
+    upgrade(get_engine())
+    db = SessionLocal()
+    started = time.perf_counter()
+    summary = generate(db, seed=args.seed, anchor=args.anchor_date or ANCHOR_DATE, **SCALES[args.scale])
+    generate_seconds = time.perf_counter() - started
+
+    client = None
+    if not args.no_http:
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        client = TestClient(app)
+        client.__enter__()
+    else:
+        from app.coverage_index import coverage_index
+
+        coverage_index.load(db)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "anchor_date": summary["anchor_date"].isoformat(),
+            "caches": args.caches,
+            "generate_seconds": round(generate_seconds, 3),
+            "dataset": {
+                key: value
+                for key, value in summary.items()
+                if key not in ("contract_ids", "product_ids", "anchor_date")
+            },
+        }
+    }
+    try:
+        for name in args.suites or list(SUITES):
+            results[name] = SUITES[name](db, client, summary, args)
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+        db.close()
+        get_engine().dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark decision and KPI hot paths on synthetic data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", dest="suites")
+    parser.add_argument("--decisions", type=int, default=5000)
+    parser.add_argument("--ingest-rows", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--anchor-date",
+        type=date.fromisoformat,
+        help="date the synthetic contracts, KPI history and decision dates are built around (default: a fixed date)",
+    )
+    parser.add_argument("--no-http", action="store_true", help="only run service-level benchmarks")
+    parser.add_argument(
+        "--caches",
+        action="store_true",
+        help="keep the response and decision caches on (HTTP numbers then time cache hits)",
+    )
+    parser.add_argument("--database", help="SQLite file to use (default: a fresh temporary file)")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.database:
+        results = run_suites(args, args.database)
+    else:
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            results = run_suites(args, os.path.join(workdir, "bench.db"))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app import schemas
+from app.serialization import dumps, orjson
+from app.services import KPI_TYPES, build_kpi_series_columns
+
+SERIES_LIST = TypeAdapter(List[schemas.KPISeries])
+
+
+def series_payload(points: int, seed: int = 7):
+    rng = random.Random(seed)
+    per_type = points // len(KPI_TYPES)
+    first_day = date.today() - timedelta(days=per_type)
+    dates = [first_day + timedelta(days=offset) for offset in range(per_type)]
+    payload = []
+    for kpi_type in sorted(KPI_TYPES):
+        expected = [rng.randint(0, 20) for _ in dates]
+        actual = [max(0, value + rng.randint(-3, 3)) for value in expected]
+        payload.append({"kpi_type": kpi_type, "series": build_kpi_series_columns(dates, expected, actual)})
+    return payload
+
+
+def response_model_path(payload) -> bytes:
+    validated = SERIES_LIST.validate_python(payload)
+    content = SERIES_LIST.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def type_adapter_path(payload) -> bytes:
+    return SERIES_LIST.dump_json(SERIES_LIST.validate_python(payload))
+
+
+def ms_per_10k(fn: Callable[[object], bytes], payload, points: int, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(payload)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000 * 10000 / points
+
+
+def main(points: int = 60000, runs: int = 5) -> None:
+    payload = series_payload(points)
+    points = sum(len(item["series"]) for item in payload)
+
+    results = {
+        "points": points,
+        "response_model_ms_per_10k": ms_per_10k(response_model_path, payload, points, runs),
+        "type_adapter_ms_per_10k": ms_per_10k(type_adapter_path, payload, points, runs),
+        "pydantic_core_to_json_ms_per_10k": ms_per_10k(to_json, payload, points, runs),
+        "dumps_ms_per_10k": ms_per_10k(dumps, payload, points, runs),
+    }
+    if orjson is not None:
+        results["orjson_ms_per_10k"] = ms_per_10k(orjson.dumps, payload, points, runs)
+    print(json.dumps({key: round(value, 2) for key, value in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import execute_many
+from app.kpi_rollup import rebuild_kpi_rollup
+from app.seed import seed_data
+from app.services import KPI_TYPES
+
+START_RULES = ("purchase_date", "activation_date", "manufacture_date", "contract_start")
+INPUT_NAMES = ("serial_number", "purchase_date", "activation_date", "proof_provided")
+
+ANCHOR_DATE = date(2025, 1, 1)
+
+
+def generate(
+    db: Session,
+    clients: int = 10,
+    contracts_per_client: int = 10,
+    appendices_per_contract: int = 3,
+    lines_per_appendix: int = 10,
+    products: int = 20,
+    history_days: Sequence[int] = (365, 730, 1825),
+    kpi_contracts: int = 6,
+    seed: int = 42,
+    anchor: date = ANCHOR_DATE,
+) -> Dict[str, object]:
+    seed_data(db)
+    rng = random.Random(seed)
+    longest = max(history_days) if history_days else 365
+
+    product_rows = [models.Product(name=f"Synthetic product {i}") for i in range(products)]
+    client_rows = [models.Client(name=f"Synthetic client {i}") for i in range(clients)]
+    db.add_all(product_rows + client_rows)
+    db.flush()
+    product_ids = [row.id for row in product_rows]
+
+    contract_rows = []
+    for client in client_rows:
+        for i in range(contracts_per_client):
+            contract_rows.append(
+                models.Contract(
+                    client_id=client.id,
+                    name=f"{client.name} contract {i}",
+                    start_date=anchor - timedelta(days=longest),
+                    end_date=anchor + timedelta(days=365),
+                    status="active",
+                    warranty_start_rule="contract_start",
+                    warranty_duration_months=12,
+                    warranty_options=["repair", "replace"],
+                    out_of_warranty_options=["paid_repair"],
+                )
+            )
+    db.add_all(contract_rows)
+    db.flush()
+
+    appendix_rows = []
+    for contract in contract_rows:
+        span = (contract.end_date - contract.start_date).days // max(appendices_per_contract, 1)
+        for i in range(appendices_per_contract):
+            start = contract.start_date + timedelta(days=i * span)
+            end = contract.end_date if i == appendices_per_contract - 1 else start + timedelta(days=span - 1)
+            appendix_rows.append(
+                models.Appendix(
+                    contract_id=contract.id,
+                    name=f"Renewal {i}",
+                    start_date=start,
+                    end_date=end,
+                    status="active",
+                )
+            )
+    db.add_all(appendix_rows)
+    db.flush()
+
+    line_rows = []
+    for appendix in appendix_rows:
+        for product_id in rng.sample(product_ids, min(lines_per_appendix, len(product_ids))):
+            line_rows.append(
+                {
+                    "appendix_id": appendix.id,
+                    "product_id": product_id,
+                    "start_date": appendix.start_date,
+                    "end_date": appendix.end_date,
+                    "status": "active",
+                    "warranty_start_rule": rng.choice(START_RULES),
+                    "warranty_duration_months": rng.choice((12, 18, 24, 36)),
+                    "warranty_options": ["repair", "replace"],
+                    "out_of_warranty_options": ["paid_repair"],
+                    "required_inputs": ["serial_number"],
+                }
+            )
+    execute_many(db, insert(models.ContractLine.__table__), line_rows)
+
+    kpi_history: Dict[int, List[int]] = {}
+    expected_rows = []
+    actual_rows = []
+    for i, contract in enumerate(contract_rows[:kpi_contracts]):
+        days = history_days[i % len(history_days)]
+        kpi_history.setdefault(days, []).append(contract.id)
+        for kpi_type in sorted(KPI_TYPES):
+            for offset in range(days):
+                day = anchor - timedelta(days=days - offset)
+                expected = rng.randint(0, 20)
+                actual = max(0, expected + rng.randint(-3, 3) + (15 if rng.random() < 0.02 else 0))
+                expected_rows.append(
+                    {"contract_id": contract.id, "kpi_type": kpi_type, "date": day, "expected_value": expected}
+                )
+                actual_rows.append(
+                    {"contract_id": contract.id, "kpi_type": kpi_type, "date": day, "actual_value": actual}
+                )
+    execute_many(db, insert(models.KPIExpected.__table__), expected_rows)
+    execute_many(db, insert(models.KPIActual.__table__), actual_rows)
+    db.commit()
+
+    rebuild_kpi_rollup(db, [contract_id for ids in kpi_history.values() for contract_id in ids])
+
+    return {
+        "clients": clients,
+        "contracts": len(contract_rows),
+        "appendices": len(appendix_rows),
+        "lines": len(line_rows),
+        "products": products,
+        "kpi_rows": len(expected_rows) + len(actual_rows),
+        "kpi_contracts_by_history_days": {str(days): ids for days, ids in sorted(kpi_history.items())},
+        "contract_ids": [row.id for row in contract_rows],
+        "product_ids": product_ids,
+        "anchor_date": anchor,
+    }
@@ -32,6 +32,8 @@ CREATE TABLE IF NOT EXISTS appendices (
     FOREIGN KEY (contract_id) REFERENCES contracts(id)
 );
 
+CREATE INDEX IF NOT EXISTS ix_appendices_contract_id ON appendices (contract_id);
+
 CREATE TABLE IF NOT EXISTS contract_lines (
     id INTEGER PRIMARY KEY,
     appendix_id INTEGER NOT NULL,
@@ -58,6 +60,9 @@ CREATE TABLE IF NOT EXISTS kpi_expected (
     FOREIGN KEY (contract_id) REFERENCES contracts(id)
 );
 
+CREATE INDEX IF NOT EXISTS ix_kpi_expected_contract_type_date
+    ON kpi_expected (contract_id, kpi_type, date, expected_value);
+
 CREATE TABLE IF NOT EXISTS kpi_actual (
     id INTEGER PRIMARY KEY,
     contract_id INTEGER NOT NULL,
@@ -66,3 +71,75 @@ CREATE TABLE IF NOT EXISTS kpi_actual (
     actual_value INTEGER NOT NULL,
     FOREIGN KEY (contract_id) REFERENCES contracts(id)
 );
+
+CREATE INDEX IF NOT EXISTS ix_kpi_actual_contract_type_date
+    ON kpi_actual (contract_id, kpi_type, date, actual_value);
+
+CREATE TABLE IF NOT EXISTS kpi_daily (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL,
+    kpi_type TEXT NOT NULL,
+    date DATE NOT NULL,
+    expected_value INTEGER NOT NULL DEFAULT 0,
+    actual_value INTEGER NOT NULL DEFAULT 0,
+    expected_cumulative INTEGER NOT NULL DEFAULT 0,
+    actual_cumulative INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (contract_id) REFERENCES contracts(id),
+    UNIQUE (contract_id, kpi_type, date)
+);
+
+CREATE TABLE IF NOT EXISTS kpi_monthly (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL,
+    kpi_type TEXT NOT NULL,
+    date DATE NOT NULL,
+    expected_value INTEGER NOT NULL DEFAULT 0,
+    actual_value INTEGER NOT NULL DEFAULT 0,
+    expected_cumulative INTEGER NOT NULL DEFAULT 0,
+    actual_cumulative INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (contract_id) REFERENCES contracts(id),
+    UNIQUE (contract_id, kpi_type, date)
+);
+
+CREATE TABLE IF NOT EXISTS kpi_alerts (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL,
+    kpi_type TEXT NOT NULL,
+    date DATE NOT NULL,
+    alert_level TEXT NOT NULL,
+    delta_percent REAL NOT NULL,
+    spike BOOLEAN NOT NULL,
+    FOREIGN KEY (contract_id) REFERENCES contracts(id),
+    UNIQUE (contract_id, kpi_type, date)
+);
+
+CREATE TABLE IF NOT EXISTS kpi_anomaly_state (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL,
+    kpi_type TEXT NOT NULL,
+    last_date DATE NOT NULL,
+    count INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    variance REAL NOT NULL,
+    FOREIGN KEY (contract_id) REFERENCES contracts(id),
+    UNIQUE (contract_id, kpi_type)
+);
+
+CREATE TABLE IF NOT EXISTS kpi_anomalies (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL,
+    kpi_type TEXT NOT NULL,
+    date DATE NOT NULL,
+    actual_value INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    std REAL NOT NULL,
+    z_score REAL NOT NULL,
+    FOREIGN KEY (contract_id) REFERENCES contracts(id),
+    UNIQUE (contract_id, kpi_type, date)
+);
+
+CREATE TABLE IF NOT EXISTS coverage_changes (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL,
+    FOREIGN KEY (contract_id) REFERENCES contracts(id)
+);
@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'app.db'}"
+
+
+@pytest.fixture
+def make_client(database_url):
+    clients = []
+
+    def make(**overrides):
+        config = Settings(database_url=database_url, create_schema=True, seed_demo_data=True, **overrides)
+        client = TestClient(create_app(config))
+        clients.append(client.__enter__())
+        return client
+
+    yield make
+    for client in clients:
+        client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
@@ -0,0 +1,8 @@
+from bench.cold_start import median_timings, prepare_database
+
+COLD_START_BUDGET_MS = 1500
+
+
+def test_import_to_first_request_within_budget(tmp_path):
+    timings = median_timings(prepare_database(str(tmp_path)), runs=3)
+    assert timings["total_ms"] < COLD_START_BUDGET_MS, timings
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import contract_import, models
+from app.coverage_index import coverage_index
+from app.database import get_engine
+
+START = date.today() - timedelta(days=10)
+END = START + timedelta(days=365)
+BEFORE_START = START - timedelta(days=1)
+
+
+def line_document(product_id=1, start=START, end=END):
+    return {
+        "product_id": product_id,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "status": "active",
+        "warranty_start_rule": "contract_start",
+        "warranty_duration_months": 12,
+        "warranty_options": ["repair"],
+        "out_of_warranty_options": ["paid_repair"],
+        "required_inputs": [],
+    }
+
+
+def contract_document(lines, client_id=1, appendix_start=START):
+    return {
+        "client_id": client_id,
+        "name": "imported",
+        "start_date": START.isoformat(),
+        "end_date": END.isoformat(),
+        "status": "active",
+        "warranty_start_rule": "contract_start",
+        "warranty_duration_months": 12,
+        "warranty_options": ["repair"],
+        "out_of_warranty_options": ["paid_repair"],
+        "appendices": [
+            {
+                "name": "a",
+                "start_date": appendix_start.isoformat(),
+                "end_date": END.isoformat(),
+                "status": "active",
+                "lines": lines,
+            }
+        ],
+    }
+
+
+def decision_body(contract_id, product_id):
+    today = date.today().isoformat()
+    return {"contract_id": contract_id, "product_id": product_id, "event_date": today, "inputs": {}}
+
+
+def row_counts():
+    with Session(get_engine()) as db:
+        return [
+            db.query(func.count(model.id)).scalar()
+            for model in (models.Contract, models.Appendix, models.ContractLine, models.CoverageChange)
+        ]
+
+
+@pytest.mark.parametrize(
+    "document, detail",
+    [
+        (contract_document([line_document()], appendix_start=BEFORE_START), "date hierarchy"),
+        (contract_document([line_document(end=END + timedelta(days=1))]), "date hierarchy"),
+        (contract_document([line_document(1), line_document(1)]), "duplicate product_id"),
+        (contract_document([line_document()], client_id=999), "client_id not found"),
+        (contract_document([line_document(999)]), "product_id not found"),
+    ],
+)
+def test_invalid_import_is_rejected_without_writes(client, document, detail):
+    before = row_counts()
+    response = client.post("/contracts/import", json=[contract_document([line_document(2)]), document])
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+    assert row_counts() == before
+
+
+def test_failed_import_rolls_back_every_row(client, monkeypatch):
+    def fail(db, contract_ids):
+        raise RuntimeError("coverage change log unavailable")
+
+    monkeypatch.setattr(contract_import, "record_coverage_changes", fail)
+    before = row_counts()
+    with pytest.raises(RuntimeError):
+        client.post("/contracts/import", json=[contract_document([line_document(1), line_document(2)])])
+    assert row_counts() == before
+
+    decision = client.post("/decisions/coverage", json=decision_body(before[0] + 1, 1)).json()
+    assert decision["reason_codes"] == ["contract_not_found"]
+
+
+def test_imported_contracts_are_decided_from_the_index(client, monkeypatch):
+    monkeypatch.setattr(coverage_index, "session_factory", None)
+    result = client.post(
+        "/contracts/import",
+        json=[contract_document([line_document(1), line_document(2)]) for _ in range(3)],
+    ).json()
+    assert result["contracts"] == 3
+    assert result["lines"] == 6
+
+    body = [
+        decision_body(contract_id, product_id)
+        for contract_id in result["contract_ids"]
+        for product_id in (1, 2)
+    ]
+    decisions = [client.post("/decisions/coverage", json=item).json() for item in body]
+    assert [decision["eligible"] for decision in decisions] == [True] * 6
+    assert [decision["resolved_contract_id"] for decision in decisions] == [
+        contract_id for contract_id in result["contract_ids"] for _ in (1, 2)
+    ]
+    assert client.post("/decisions/coverage/batch", json=body).json() == decisions
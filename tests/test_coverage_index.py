@@ -0,0 +1,71 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.coverage_index import AppendixRecord, ContractRecord, LineIntervals, LineRecord
+from app.services import match_line
+
+BASE = date(2024, 1, 1)
+
+
+def random_day(rng):
+    return BASE + timedelta(days=rng.randint(-30, 400))
+
+
+def random_period(rng):
+    start, end = sorted((random_day(rng), random_day(rng)))
+    return start, end
+
+
+def random_candidates(rng, contract):
+    candidates = []
+    for position in range(rng.randint(0, 12)):
+        if rng.random() < 0.5:
+            appendix_start, appendix_end = random_period(rng)
+        else:
+            appendix_start = contract.start_date + timedelta(days=rng.randint(0, 60))
+            appendix_end = contract.end_date - timedelta(days=rng.randint(0, 60))
+        if rng.random() < 0.5:
+            line_start, line_end = random_period(rng)
+        else:
+            line_start = appendix_start + timedelta(days=rng.randint(0, 30))
+            line_end = appendix_end - timedelta(days=rng.randint(0, 30))
+        appendix = AppendixRecord(
+            position, contract.id, appendix_start, appendix_end, rng.choice(["active", "active", "draft"])
+        )
+        line = LineRecord(
+            100 + position,
+            position,
+            1,
+            line_start,
+            line_end,
+            rng.choice(["active", "active", "inactive"]),
+            "contract_start",
+            12,
+            [],
+            [],
+            [],
+        )
+        candidates.append((appendix, line))
+    return tuple(candidates)
+
+
+def edge_days(contract, candidates):
+    days = {date.min, date.max, contract.start_date, contract.end_date}
+    for appendix, line in candidates:
+        days.update((appendix.start_date, appendix.end_date, line.start_date, line.end_date))
+    return sorted(
+        {day + timedelta(days=offset) for day in days if date.min < day < date.max for offset in (-1, 0, 1)} | days
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_lookup_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        contract = ContractRecord(1, *random_period(rng), "active")
+        candidates = random_candidates(rng, contract)
+        intervals = LineIntervals(contract, candidates)
+        for day in edge_days(contract, candidates) + [random_day(rng) for _ in range(20)]:
+            assert intervals.lookup(None, day) == match_line(contract, None, candidates, day), (seed, day)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import Session
+
+from app import coverage_index as coverage_index_module, models
+from app.coverage_index import coverage_index, record_coverage_changes
+from app.database import get_engine
+
+
+def decision_body(contract_id, product_id, event_date):
+    return {"contract_id": contract_id, "product_id": product_id, "event_date": event_date.isoformat(), "inputs": {}}
+
+
+def contract_document(start):
+    end = start + timedelta(days=365)
+    terms = {
+        "warranty_start_rule": "contract_start",
+        "warranty_duration_months": 12,
+        "warranty_options": ["repair"],
+        "out_of_warranty_options": ["paid_repair"],
+    }
+    line = {"product_id": 1, "start_date": start.isoformat(), "end_date": end.isoformat(), "status": "active"}
+    appendix = {"name": "a", "start_date": start.isoformat(), "end_date": end.isoformat(), "status": "active"}
+    return {
+        "client_id": 1,
+        "name": "imported",
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "status": "active",
+        **terms,
+        "appendices": [{**appendix, "lines": [{**line, **terms, "required_inputs": []}]}],
+    }
+
+
+def test_contract_imported_by_another_process_resolves(client, database_url, tmp_path):
+    start = date.today() - timedelta(days=10)
+    path = tmp_path / "contracts.json"
+    path.write_text(json.dumps([contract_document(start)]))
+    subprocess.run(
+        [sys.executable, "-m", "app.contract_import", str(path)],
+        env={**os.environ, "APP_DATABASE_URL": database_url},
+        check=True,
+        capture_output=True,
+    )
+
+    body = decision_body(2, 1, date.today())
+    single = client.post("/decisions/coverage", json=body).json()
+    batch = client.post("/decisions/coverage/batch", json=[body]).json()
+    assert single["resolved_contract_id"] == 2
+    assert single["eligible"] is True
+    assert single == batch[0]
+
+
+def test_line_written_by_another_process_is_picked_up(make_client, database_url):
+    client = make_client(coverage_refresh_seconds=0)
+    body = decision_body(1, 3, date.today())
+    with Session(create_engine(database_url)) as other:
+        other.add(models.Product(id=3, name="Gearbox"))
+        other.commit()
+
+    before = client.post("/decisions/coverage", json=body).json()
+    assert "no_active_line_for_product" in before["reason_codes"]
+
+    with Session(create_engine(database_url)) as other:
+        appendix = other.get(models.Appendix, 1)
+        other.add(
+            models.ContractLine(
+                appendix_id=appendix.id,
+                product_id=3,
+                start_date=appendix.start_date,
+                end_date=appendix.end_date,
+                status="active",
+                warranty_start_rule="contract_start",
+                warranty_duration_months=12,
+                warranty_options=["repair"],
+                out_of_warranty_options=["paid_repair"],
+                required_inputs=[],
+            )
+        )
+        record_coverage_changes(other, [appendix.contract_id])
+        other.commit()
+
+    after = client.post("/decisions/coverage", json=body).json()
+    assert after["eligible"] is True
+    assert after == client.post("/decisions/coverage/batch", json=[body]).json()[0]
+
+
+def test_pruned_changes_force_a_full_reload(make_client, database_url, monkeypatch):
+    monkeypatch.setattr(coverage_index_module, "COVERAGE_CHANGES_KEEP", 2)
+    client = make_client(coverage_refresh_seconds=0)
+    body = decision_body(1, 3, date.today())
+    with Session(create_engine(database_url)) as other:
+        other.add(models.Product(id=3, name="Gearbox"))
+        other.commit()
+    assert "no_active_line_for_product" in client.post("/decisions/coverage", json=body).json()["reason_codes"]
+
+    with Session(create_engine(database_url)) as other:
+        appendix = other.get(models.Appendix, 1)
+        other.add(
+            models.ContractLine(
+                appendix_id=appendix.id,
+                product_id=3,
+                start_date=appendix.start_date,
+                end_date=appendix.end_date,
+                status="active",
+                warranty_start_rule="contract_start",
+                warranty_duration_months=12,
+                warranty_options=["repair"],
+                out_of_warranty_options=["paid_repair"],
+                required_inputs=[],
+            )
+        )
+        for _ in range(4):
+            record_coverage_changes(other, [appendix.contract_id])
+        other.commit()
+        assert other.query(func.count(models.CoverageChange.id)).scalar() == 2
+
+    assert client.post("/decisions/coverage", json=body).json()["eligible"] is True
+
+
+def test_imported_contract_is_indexed_from_the_request(client, monkeypatch):
+    monkeypatch.setattr(coverage_index, "session_factory", None)
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(get_engine(), "before_cursor_execute", listener)
+    try:
+        result = client.post("/contracts/import", json=[contract_document(date.today() - timedelta(days=10))]).json()
+    finally:
+        event.remove(get_engine(), "before_cursor_execute", listener)
+    assert not any(statement.startswith("SELECT") and "contract_lines" in statement for statement in statements)
+
+    decision = client.post("/decisions/coverage", json=decision_body(result["contract_ids"][0], 1, date.today())).json()
+    assert decision["eligible"] is True
+    with Session(get_engine()) as db:
+        assert decision["resolved_line_id"] == db.query(func.max(models.ContractLine.id)).scalar()
+
+
+def test_async_unknown_ids_are_looked_up_off_the_loop_and_remembered(make_client, database_url):
+    client = make_client(async_endpoints=True, coverage_refresh_seconds=0)
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        try:
+            asyncio.get_running_loop()
+            on_loop = True
+        except RuntimeError:
+            on_loop = False
+        statements.append((statement, on_loop))
+
+    event.listen(get_engine(), "before_cursor_execute", listener)
+    try:
+        body = decision_body(999, 1, date.today())
+        assert client.post("/decisions/coverage", json=body).json()["reason_codes"] == ["contract_not_found"]
+        assert any("FROM contracts" in statement for statement, _ in statements)
+        assert not any(on_loop for _, on_loop in statements)
+
+        statements.clear()
+        assert client.post("/decisions/coverage", json=body).json()["reason_codes"] == ["contract_not_found"]
+        assert not any("FROM contracts" in statement for statement, _ in statements)
+    finally:
+        event.remove(get_engine(), "before_cursor_execute", listener)
+
+    with Session(create_engine(database_url)) as other:
+        contract = other.get(models.Contract, 1)
+        other.add(
+            models.Contract(
+                id=999,
+                client_id=contract.client_id,
+                name="late",
+                start_date=contract.start_date,
+                end_date=contract.end_date,
+                status="active",
+                warranty_start_rule="contract_start",
+                warranty_duration_months=12,
+                warranty_options=["repair"],
+                out_of_warranty_options=["paid_repair"],
+            )
+        )
+        record_coverage_changes(other, [999])
+        other.commit()
+
+    assert client.post("/decisions/coverage", json=body).json()["resolved_contract_id"] == 999
@@ -0,0 +1,19 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+
+@pytest.mark.parametrize("database_url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_sqlite(database_url):
+    app = create_app(Settings(database_url=database_url, create_schema=True, seed_demo_data=True))
+    with TestClient(app) as client:
+        written = client.post(
+            "/kpi/actual",
+            json={"contract_id": 1, "kpi_type": "repairs", "date": date.today().isoformat(), "actual_value": 3},
+        )
+        assert written.status_code == 200
+        assert client.get("/kpi/contracts/1/series").status_code == 200
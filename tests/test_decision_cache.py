@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.decision_cache import DecisionCache, decision_cache
+
+TODAY = date.today()
+
+
+def decision(contract_id=1, appendix_id=1, line_id=1):
+    return {
+        "eligible": True,
+        "resolved_contract_id": contract_id,
+        "resolved_appendix_id": appendix_id,
+        "resolved_line_id": line_id,
+    }
+
+
+def decision_body(product_id):
+    return {"contract_id": 1, "product_id": product_id, "event_date": TODAY.isoformat(), "inputs": {}}
+
+
+def period():
+    return {
+        "start_date": (TODAY - timedelta(days=30)).isoformat(),
+        "end_date": (TODAY + timedelta(days=30)).isoformat(),
+    }
+
+
+def appendix_payload():
+    return {"contract_id": 1, "name": "extra", "status": "active", **period()}
+
+
+def line_payload(appendix_id, product_id):
+    return {
+        "appendix_id": appendix_id,
+        "product_id": product_id,
+        "status": "active",
+        "warranty_start_rule": "contract_start",
+        "warranty_duration_months": 12,
+        "warranty_options": ["repair"],
+        "out_of_warranty_options": ["paid_repair"],
+        "required_inputs": [],
+        **period(),
+    }
+
+
+def cache_stats(client):
+    return client.get("/decisions/coverage/cache").json()
+
+
+def test_key_keeps_start_dates_and_reduces_other_inputs_to_presence():
+    purchased = TODAY - timedelta(days=90)
+
+    def key(serial_number, purchase_date, proof_provided):
+        inputs = {"serial_number": serial_number, "purchase_date": purchase_date}
+        return DecisionCache.key(1, None, 1, TODAY, {**inputs, "proof_provided": proof_provided})
+
+    assert key("A-1", purchased, True) == key("B-2", purchased, False)
+    assert key("A-1", purchased, True) != key(None, purchased, True)
+    assert key("A-1", purchased, True) != key("A-1", TODAY, True)
+
+
+def test_put_after_an_invalidation_is_dropped():
+    cache = DecisionCache(max_entries=10)
+    key = cache.key(1, None, 1, TODAY, {})
+    generation = cache.generation
+    cache.invalidate(contract_id=2)
+    cache.put(key, decision(), generation)
+    assert cache.get(key) is None
+
+    cache.put(key, decision(), cache.generation)
+    assert cache.get(key) == decision()
+
+
+def test_invalidate_drops_entries_that_depend_on_the_record():
+    cache = DecisionCache(max_entries=10)
+    keys = [cache.key(1, None, product_id, TODAY, {}) for product_id in (1, 2)]
+    cache.put(keys[0], decision(line_id=1), cache.generation)
+    cache.put(keys[1], decision(line_id=2), cache.generation)
+
+    cache.invalidate(line_id=1)
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) == decision(line_id=2)
+    cache.invalidate(contract_id=1)
+    assert cache.stats()["entries"] == 0
+
+
+def test_creating_records_invalidates_cached_decisions(client):
+    client.post("/decisions/coverage", json=decision_body(1))
+    assert cache_stats(client)["entries"] == 1
+
+    generation = decision_cache.generation
+    contract = client.post(
+        "/contracts",
+        json={
+            "client_id": 1,
+            "name": "second",
+            "status": "active",
+            "warranty_start_rule": "contract_start",
+            "warranty_duration_months": 12,
+            "warranty_options": ["repair"],
+            "out_of_warranty_options": ["paid_repair"],
+            **period(),
+        },
+    )
+    assert contract.status_code == 200
+    assert decision_cache.generation > generation
+    assert cache_stats(client)["entries"] == 1
+
+    appendix = client.post("/appendices", json=appendix_payload())
+    assert appendix.status_code == 200
+    assert cache_stats(client)["entries"] == 0
+
+    client.post("/decisions/coverage", json=decision_body(1))
+    line = client.post("/contract-lines", json=line_payload(appendix.json()["id"], 2))
+    assert line.status_code == 200
+    assert cache_stats(client)["entries"] == 0
+
+
+def test_cached_decision_follows_new_appendix_and_line(client, database_url):
+    with Session(create_engine(database_url)) as db:
+        db.add(models.Product(id=3, name="Gearbox"))
+        db.commit()
+
+    body = decision_body(3)
+    before = client.post("/decisions/coverage", json=body).json()
+    assert "no_active_line_for_product" in before["reason_codes"]
+    assert client.post("/decisions/coverage", json=body).json() == before
+    assert cache_stats(client)["hits"] == 1
+
+    appendix = client.post("/appendices", json=appendix_payload())
+    between = client.post("/decisions/coverage", json=body).json()
+    assert "no_active_line_for_product" in between["reason_codes"]
+    client.post("/contract-lines", json=line_payload(appendix.json()["id"], 3))
+
+    after = client.post("/decisions/coverage", json=body).json()
+    assert after["eligible"] is True
+    assert after["resolved_appendix_id"] == appendix.json()["id"]
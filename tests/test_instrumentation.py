@@ -0,0 +1,36 @@
+import re
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+from app import instrumentation
+from app.config import Settings
+from app.main import create_app
+
+
+def test_factory_config_enables_service_timing(make_client):
+    client = make_client(instrumentation=True)
+    response = client.post(
+        "/decisions/coverage",
+        json={"contract_id": 1, "product_id": 1, "event_date": date.today().isoformat(), "inputs": {}},
+    )
+    service_ms = float(re.search(r"svc;dur=([0-9.]+)", response.headers["Server-Timing"]).group(1))
+    assert service_ms > 0
+
+    routes = {route["route"]: route for route in client.get("/metrics").json()["routes"]}
+    assert routes["/decisions/coverage"]["service_ms"] > 0
+
+
+def test_instrumentation_is_removed_with_its_app(database_url):
+    config = Settings(database_url=database_url, create_schema=True, seed_demo_data=True, instrumentation=True)
+    with TestClient(create_app(config)):
+        assert event.contains(Engine, "before_cursor_execute", instrumentation.before_cursor_execute)
+    assert not event.contains(Engine, "before_cursor_execute", instrumentation.before_cursor_execute)
+    assert not event.contains(Session, "do_orm_execute", instrumentation.time_orm_execute)
+
+    with TestClient(create_app(Settings(database_url=database_url))) as plain:
+        response = plain.get("/kpi/contracts/1/series")
+        assert "Server-Timing" not in response.headers
+        assert plain.get("/metrics").status_code == 404
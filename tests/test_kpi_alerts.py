@@ -0,0 +1,17 @@
+import json
+
+from app import main
+
+
+def test_portfolio_alerts_stream_as_json_array_or_ndjson(client, monkeypatch):
+    monkeypatch.setattr(main, "STREAM_CHUNK_LINES", 2)
+    alerts = client.get("/kpi/alerts")
+    assert alerts.headers["content-type"] == "application/json"
+    assert len(alerts.json()) > 2
+
+    lines = client.get("/kpi/alerts", headers={"accept": "application/x-ndjson"})
+    assert lines.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in lines.text.splitlines()] == alerts.json()
+
+    assert client.get("/kpi/alerts", params={"from": "2999-01-01"}).json() == []
+    assert client.get("/kpi/alerts", params={"client_id": 999}).status_code == 404
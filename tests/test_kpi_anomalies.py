@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.kpi_anomalies import (
+    ANOMALY_ALPHA,
+    ANOMALY_MIN_STD,
+    ANOMALY_WARMUP,
+    ANOMALY_Z_THRESHOLD,
+    StreamState,
+    advance_streams,
+)
+
+START = date(2025, 1, 1)
+
+
+def steady_state(days, value=10):
+    state = StreamState()
+    for offset in range(days):
+        assert state.observe(START + timedelta(days=offset), value) is None
+    return state
+
+
+def test_spikes_during_warmup_are_not_flagged():
+    state = steady_state(3)
+    for offset in range(3, ANOMALY_WARMUP):
+        assert state.observe(START + timedelta(days=offset), 10 if offset % 2 else 500) is None
+    assert state.count == ANOMALY_WARMUP
+
+
+@pytest.mark.parametrize("value", [10 + ANOMALY_Z_THRESHOLD * ANOMALY_MIN_STD, 6, 60])
+def test_values_past_the_z_threshold_are_flagged_after_warmup(value):
+    state = steady_state(ANOMALY_WARMUP)
+    mean, std, z_score = state.observe(START + timedelta(days=ANOMALY_WARMUP), value)
+    assert (mean, std) == (10.0, ANOMALY_MIN_STD)
+    assert z_score == pytest.approx(value - 10)
+    clamped = max(min(value - 10, ANOMALY_Z_THRESHOLD), -ANOMALY_Z_THRESHOLD)
+    assert state.mean == pytest.approx(10 + ANOMALY_ALPHA * clamped)
+
+
+def test_values_inside_the_threshold_are_not_flagged():
+    state = steady_state(ANOMALY_WARMUP)
+    assert state.observe(START + timedelta(days=ANOMALY_WARMUP), 12) is None
+    assert state.last_date == START + timedelta(days=ANOMALY_WARMUP)
+
+
+def test_points_on_or_before_the_last_date_are_ignored():
+    last_date = START + timedelta(days=ANOMALY_WARMUP - 1)
+    states = {(1, "repairs"): steady_state(ANOMALY_WARMUP), (2, "repairs"): steady_state(ANOMALY_WARMUP)}
+    points = [
+        (1, "repairs", last_date - timedelta(days=1), 500),
+        (1, "repairs", last_date, 500),
+        (1, "repairs", last_date + timedelta(days=1), 10),
+        (2, "repairs", last_date, 500),
+    ]
+
+    changed, anomalies = advance_streams(states, points)
+    assert changed == [(1, "repairs")]
+    assert anomalies == []
+    assert states[(1, "repairs")].count == ANOMALY_WARMUP + 1
+    assert states[(1, "repairs")].last_date == last_date + timedelta(days=1)
+    assert states[(2, "repairs")].count == ANOMALY_WARMUP
@@ -0,0 +1,66 @@
+import csv
+import io
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database import get_engine
+from app.kpi_retention import compact_kpi_history
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+
+def arrow_rows(data):
+    return pa.ipc.open_stream(data).read_all().to_pylist()
+
+
+def parquet_rows(data):
+    return pa.parquet.read_table(pa.BufferReader(data)).to_pylist()
+
+
+def csv_rows(data):
+    return [
+        {
+            **row,
+            "contract_id": int(row["contract_id"]),
+            "date": date.fromisoformat(row["date"]),
+            "expected": int(row["expected"]),
+            "actual": int(row["actual"]),
+        }
+        for row in csv.DictReader(io.StringIO(data.decode()))
+    ]
+
+
+DECODERS = {"arrow": arrow_rows, "parquet": parquet_rows, "csv": csv_rows}
+
+
+@pytest.mark.parametrize("export_format", sorted(DECODERS))
+def test_export_decodes_to_series_values_with_compacted_months(client, export_format):
+    old = date.today() - timedelta(days=100)
+    for offset in range(40):
+        day = (old + timedelta(days=offset)).isoformat()
+        for source, value in (("expected", 3), ("actual", offset % 5)):
+            payload = {"contract_id": 1, "kpi_type": "repairs", "date": day, f"{source}_value": value}
+            assert client.post(f"/kpi/{source}", json=payload).status_code == 200
+
+    before = (date.today() - timedelta(days=45)).replace(day=1)
+    with Session(get_engine()) as db:
+        compacted_days, months = compact_kpi_history(db, before, [1])
+    assert compacted_days and months
+
+    series = [
+        (1, item["kpi_type"], date.fromisoformat(point["date"]), point["expected"], point["actual"])
+        for item in client.get("/kpi/contracts/1/series").json()
+        for point in item["series"]
+    ]
+    response = client.get("/kpi/export", params={"format": export_format, "contract_id": 1})
+    assert response.status_code == 200
+    rows = DECODERS[export_format](response.content)
+
+    columns = ("contract_id", "kpi_type", "date", "expected", "actual")
+    assert [tuple(row[column] for column in columns) for row in rows] == sorted(series)
+    assert {row["granularity"] for row in rows if row["date"] < before} == {"month"}
+    assert {row["granularity"] for row in rows if row["date"] >= before} == {"day"}
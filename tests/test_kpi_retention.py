@@ -0,0 +1,66 @@
+from datetime import date
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import Base
+from app.kpi_export import kpi_export_statement
+from app.kpi_retention import compact_kpi_history
+
+
+def test_compaction_uses_raw_rows_and_export_keeps_monthly_history(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(models.Client(id=1, name="client"))
+        db.add(
+            models.Contract(
+                id=1,
+                client_id=1,
+                name="c",
+                start_date=date(2024, 1, 1),
+                end_date=date(2025, 12, 31),
+                status="active",
+                warranty_start_rule="contract_start",
+                warranty_duration_months=12,
+                warranty_options=[],
+                out_of_warranty_options=[],
+            )
+        )
+        for day in range(1, 11):
+            db.add(models.KPIExpected(contract_id=1, kpi_type="repairs", date=date(2024, 1, day), expected_value=2))
+            db.add(models.KPIActual(contract_id=1, kpi_type="repairs", date=date(2024, 1, day), actual_value=3))
+        db.add(models.KPIExpected(contract_id=1, kpi_type="repairs", date=date(2024, 2, 5), expected_value=7))
+        db.add(
+            models.KPIDaily(
+                contract_id=1,
+                kpi_type="repairs",
+                date=date(2024, 3, 1),
+                expected_value=1,
+                actual_value=1,
+                expected_cumulative=28,
+                actual_cumulative=31,
+            )
+        )
+        db.commit()
+
+        assert compact_kpi_history(db, date(2024, 3, 1)) == (11, 2)
+        assert db.scalar(select(func.count()).select_from(models.KPIExpected)) == 0
+        assert db.scalar(select(func.count()).select_from(models.KPIActual)) == 0
+        months = db.execute(
+            select(
+                models.KPIMonthly.date,
+                models.KPIMonthly.expected_value,
+                models.KPIMonthly.actual_value,
+                models.KPIMonthly.expected_cumulative,
+                models.KPIMonthly.actual_cumulative,
+            ).order_by(models.KPIMonthly.date)
+        ).all()
+        assert months == [(date(2024, 1, 1), 20, 30, 20, 30), (date(2024, 2, 1), 7, 0, 27, 30)]
+
+        exported = db.execute(kpi_export_statement(date_from=date(2024, 2, 10))).all()
+        assert exported == [
+            (1, "repairs", date(2024, 2, 1), "month", 7, 0),
+            (1, "repairs", date(2024, 3, 1), "day", 1, 1),
+        ]
@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import Base, get_engine
+from app.kpi_ingest import ingest_kpi_values
+from app.services import build_kpi_series
+
+START = date(2025, 1, 1)
+
+
+def kpi_session(tmp_path, contracts):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add(models.Client(id=1, name="client"))
+    for contract_id in range(1, contracts + 1):
+        db.add(
+            models.Contract(
+                id=contract_id,
+                client_id=1,
+                name="c",
+                start_date=START,
+                end_date=START + timedelta(days=730),
+                status="active",
+                warranty_start_rule="contract_start",
+                warranty_duration_months=12,
+                warranty_options=[],
+                out_of_warranty_options=[],
+            )
+        )
+    db.commit()
+    return db
+
+
+def daily_ids(db):
+    daily = models.KPIDaily
+    return {
+        (row.contract_id, row.kpi_type, row.date): row.id
+        for row in db.execute(select(daily.contract_id, daily.kpi_type, daily.date, daily.id))
+    }
+
+
+def test_back_dated_write_only_rewrites_its_own_stream(tmp_path):
+    with kpi_session(tmp_path, 3) as db:
+        ingest_kpi_values(
+            db,
+            "actual",
+            {
+                (contract_id, kpi_type, START + timedelta(days=offset)): 1
+                for contract_id in (1, 2, 3)
+                for kpi_type in ("repairs", "refunds")
+                for offset in range(30)
+            },
+        )
+        db.commit()
+        before = daily_ids(db)
+
+        back_dated = {(1, "repairs", START): 5, (2, "refunds", START + timedelta(days=30)): 1}
+        ingest_kpi_values(db, "actual", back_dated)
+        db.commit()
+        after = daily_ids(db)
+
+        rewritten = {key[:2] for key in before if after[key] != before[key]}
+        assert rewritten == {(1, "repairs")}
+        last = db.execute(
+            select(models.KPIDaily.actual_cumulative).where(
+                models.KPIDaily.contract_id == 1,
+                models.KPIDaily.kpi_type == "repairs",
+                models.KPIDaily.date == START + timedelta(days=29),
+            )
+        ).scalar_one()
+        assert last == 34
+
+
+def test_out_of_order_writes_match_a_series_built_from_raw_rows(client):
+    today = date.today()
+
+    def repairs_series():
+        series = client.get("/kpi/contracts/1/series", params={"kpi_type": "repairs"}).json()
+        return {point["date"]: point for point in series[0]["series"]}
+
+    before = repairs_series()
+    writes = [
+        ("actual", today + timedelta(days=3), 6),
+        ("expected", today + timedelta(days=3), 5),
+        ("actual", today - timedelta(days=20), 9),
+        ("expected", today - timedelta(days=3), 8),
+        ("actual", today - timedelta(days=3), 12),
+        ("actual", today - timedelta(days=3), 7),
+    ]
+    for source, day, value in writes:
+        payload = {"contract_id": 1, "kpi_type": "repairs", "date": day.isoformat()}
+        payload[f"{source}_value"] = value
+        assert client.post(f"/kpi/{source}", json=payload).status_code == 200
+
+    after = repairs_series()
+    overwritten = after[(today - timedelta(days=3)).isoformat()]
+    assert (overwritten["expected"], overwritten["actual"]) == (8, 7)
+    replaced = before[overwritten["date"]]["actual"]
+    shifted = before[today.isoformat()]["actual_cumulative"] + 9 - replaced + 7
+    assert after[today.isoformat()]["actual_cumulative"] == shifted
+
+    with Session(get_engine()) as db:
+        rebuilt = build_kpi_series(
+            *(
+                db.query(model).filter_by(contract_id=1, kpi_type="repairs").order_by(model.id).all()
+                for model in (models.KPIExpected, models.KPIActual)
+            )
+        )
+    assert list(after.values()) == [{**point, "date": point["date"].isoformat()} for point in rebuilt]
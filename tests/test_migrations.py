@@ -0,0 +1,113 @@
+from datetime import date
+
+from sqlalchemy import create_engine, select
+
+from app import models
+from app.kpi_engine import kpi_rows_statement, kpi_series_statement
+from app.migrations import upgrade
+
+BASELINE_SCHEMA = """
+CREATE TABLE clients (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE contracts (
+    id INTEGER PRIMARY KEY,
+    client_id INTEGER NOT NULL REFERENCES clients(id),
+    name TEXT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    status TEXT NOT NULL,
+    warranty_start_rule TEXT NOT NULL,
+    warranty_duration_months INTEGER NOT NULL,
+    warranty_options JSON NOT NULL,
+    out_of_warranty_options JSON NOT NULL
+);
+CREATE TABLE appendices (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL REFERENCES contracts(id),
+    name TEXT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE contract_lines (
+    id INTEGER PRIMARY KEY,
+    appendix_id INTEGER NOT NULL REFERENCES appendices(id),
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    status TEXT NOT NULL,
+    warranty_start_rule TEXT NOT NULL,
+    warranty_duration_months INTEGER NOT NULL,
+    warranty_options JSON NOT NULL,
+    out_of_warranty_options JSON NOT NULL,
+    required_inputs JSON NOT NULL,
+    UNIQUE (appendix_id, product_id)
+);
+CREATE TABLE kpi_expected (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL REFERENCES contracts(id),
+    kpi_type TEXT NOT NULL,
+    date DATE NOT NULL,
+    expected_value INTEGER NOT NULL
+);
+CREATE TABLE kpi_actual (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL REFERENCES contracts(id),
+    kpi_type TEXT NOT NULL,
+    date DATE NOT NULL,
+    actual_value INTEGER NOT NULL
+);
+"""
+
+
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA.split(";"):
+            if statement.strip():
+                connection.exec_driver_sql(statement)
+    return engine
+
+
+def query_plan(engine, statement) -> str:
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        return "\n".join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+
+
+def schema_snapshot(engine):
+    with engine.connect() as connection:
+        return sorted(connection.exec_driver_sql("SELECT type, name, sql FROM sqlite_master").all())
+
+
+def test_upgrade_adds_indexes_used_by_hot_queries(tmp_path):
+    engine = baseline_engine(tmp_path)
+    created = upgrade(engine)
+    assert {
+        "ix_kpi_expected_contract_type_date",
+        "ix_kpi_actual_contract_type_date",
+        "ix_appendices_contract_id",
+    } <= set(created)
+
+    rows_plan = query_plan(engine, kpi_rows_statement(1))
+    assert "COVERING INDEX ix_kpi_expected_contract_type_date" in rows_plan
+    assert "COVERING INDEX ix_kpi_actual_contract_type_date" in rows_plan
+
+    appendices_plan = query_plan(engine, select(models.Appendix.id).where(models.Appendix.contract_id == 1))
+    assert "ix_appendices_contract_id" in appendices_plan
+
+    with engine.connect() as connection:
+        daily_index = connection.exec_driver_sql(
+            "SELECT name FROM pragma_index_list('kpi_daily') WHERE \"unique\" = 1 AND origin = 'u'"
+        ).scalar_one()
+    series_plan = query_plan(engine, kpi_series_statement(1, date(2025, 1, 1), date(2025, 3, 31), ["repairs"]))
+    assert f"INDEX {daily_index}" in series_plan
+    assert "SCAN kpi_daily" not in series_plan
+
+
+def test_upgrade_twice_is_a_no_op(tmp_path):
+    engine = baseline_engine(tmp_path)
+    upgrade(engine)
+    migrated = schema_snapshot(engine)
+    assert upgrade(engine) == []
+    assert schema_snapshot(engine) == migrated
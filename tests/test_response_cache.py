@@ -0,0 +1,50 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.kpi_rollup import apply_kpi_value
+
+SERIES = "/kpi/contracts/1/series"
+
+
+def repairs_actual_today(response):
+    series = next(item["series"] for item in response.json() if item["kpi_type"] == "repairs")
+    return series[-1]["actual"]
+
+
+def test_repeated_get_with_etag_is_not_modified(client):
+    first = client.get(SERIES)
+    assert first.status_code == 200
+
+    again = client.get(SERIES, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_kpi_write_changes_the_etag(client):
+    first = client.get(SERIES)
+    response = client.post(
+        "/kpi/actual",
+        json={"contract_id": 1, "kpi_type": "repairs", "date": date.today().isoformat(), "actual_value": 40},
+    )
+    assert response.status_code == 200
+
+    after = client.get(SERIES, headers={"If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != first.headers["ETag"]
+    assert repairs_actual_today(after) == 40
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_only_an_enabled_response_cache_serves_stored_bodies(make_client, database_url, enabled):
+    client = make_client(response_cache=enabled)
+    before = repairs_actual_today(client.get(SERIES))
+
+    with Session(create_engine(database_url)) as other:
+        apply_kpi_value(other, 1, "repairs", date.today(), "actual", 40)
+        other.commit()
+
+    assert repairs_actual_today(client.get(SERIES)) == (before if enabled else 40)
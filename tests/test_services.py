@@ -0,0 +1,108 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import Base
+from app.serialization import dumps
+from app.services import (
+    VECTORIZED_MIN_POINTS,
+    build_kpi_series_loop,
+    build_kpi_series_vectorized,
+    decide_coverage,
+)
+
+TERMS = {
+    "warranty_start_rule": "contract_start",
+    "warranty_duration_months": 12,
+    "warranty_options": ["repair"],
+    "out_of_warranty_options": ["paid_repair"],
+}
+
+
+def contract_graph(db, appendices):
+    start = date(2024, 1, 1)
+    end = date(2026, 12, 31)
+    db.add(models.Client(id=1, name="client"))
+    db.add(models.Product(id=1, name="product"))
+    db.add(models.Contract(id=1, client_id=1, name="c", start_date=start, end_date=end, status="active", **TERMS))
+    for appendix_id in range(1, appendices + 1):
+        appendix_start = start + timedelta(days=appendix_id % 300)
+        db.add(
+            models.Appendix(
+                id=appendix_id, contract_id=1, name="a", start_date=appendix_start, end_date=end, status="active"
+            )
+        )
+        db.add(
+            models.ContractLine(
+                appendix_id=appendix_id,
+                product_id=1,
+                start_date=appendix_start,
+                end_date=end,
+                status="active",
+                required_inputs=[],
+                **TERMS,
+            )
+        )
+    db.commit()
+
+
+@pytest.mark.parametrize("appendices", [1, 50, 200])
+def test_decision_query_count_does_not_grow_with_appendices(tmp_path, appendices):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        contract_graph(db, appendices)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    inputs = schemas.DecisionInputs().model_dump()
+    with Session(engine) as db:
+        decision = decide_coverage(db, 1, None, 1, date(2025, 6, 1), inputs)
+    assert decision["resolved_contract_id"] == 1
+    assert decision["resolved_line_id"] is not None
+    assert len(statements) == 2
+
+    statements.clear()
+    with Session(engine) as db:
+        decision = decide_coverage(db, None, appendices, 1, date(2025, 6, 1), inputs)
+    assert decision["resolved_appendix_id"] == appendices
+    assert len(statements) == 2
+
+
+def series_columns(rng, length):
+    start = date(2024, 1, 1)
+    expected_map = {}
+    actual_map = {}
+    for offset in range(length):
+        day = start + timedelta(days=offset)
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        if roll < 0.3:
+            expected_map[day] = rng.randint(0, 20)
+        elif roll < 0.5:
+            actual_map[day] = rng.randint(0, 20)
+        else:
+            expected_map[day] = rng.choice([0, rng.randint(1, 40)])
+            actual_map[day] = rng.choice([0, rng.randint(1, 60)])
+    dates = sorted(set(expected_map) | set(actual_map))
+    return dates, [expected_map.get(day, 0) for day in dates], [actual_map.get(day, 0) for day in dates]
+
+
+@pytest.mark.parametrize("length", [1, 10, VECTORIZED_MIN_POINTS - 1, VECTORIZED_MIN_POINTS, 5000])
+@pytest.mark.parametrize("offsets", [(0, 0), (1234, 987), (-50, 3)])
+def test_vectorized_series_matches_loop(length, offsets):
+    pytest.importorskip("numpy")
+    rng = random.Random(length)
+    dates, expected_values, actual_values = series_columns(rng, length)
+    expected_values[:3] = [0, 0, 7][: len(expected_values)]
+    actual_values[:3] = [0, 5, 0][: len(actual_values)]
+
+    loop = build_kpi_series_loop(dates, expected_values, actual_values, *offsets)
+    vectorized = build_kpi_series_vectorized(dates, expected_values, actual_values, *offsets)
+    assert vectorized == loop
+    assert dumps(vectorized) == dumps(loop)